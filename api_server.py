@@ -0,0 +1,238 @@
+import json
+import os
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from metrics import render_metrics
+from portfolio_io import get_returns_file, read_portfolio
+from snapshots import get_latest_snapshot
+from config import PORT_API, SNAPSHOT_DIR
+
+def to_records(frame):
+    """
+    Convert a frame to JSON-ready records, with missing values as null.
+
+    Args:
+        frame (pd.DataFrame): The rows to convert.
+
+    Returns:
+        list: One dict per row.
+    """
+    return json.loads(frame.to_json(orient="records"))
+
+def summarize_types(portfolio, returns_summary):
+    """
+    Total the valued positions of each Type.
+
+    Args:
+        portfolio (pd.DataFrame): Computed portfolio.
+        returns_summary (pd.DataFrame): Returns summary sidecar, possibly empty.
+
+    Returns:
+        pd.DataFrame: `Type`, `Positions`, `Value`, `Cost`, `Gain/Loss`,
+                      `% Gain/Loss`, `% Allocation`, `% XIRR` and `% TWR`.
+    """
+    valued = portfolio[portfolio["Value"] > 0]
+    summary = valued.groupby("Type").agg(
+        Positions=("Value", "size"),
+        Value=("Value", "sum"),
+        **{"Gain/Loss": ("Gain/Loss", "sum")}
+    ).reset_index()
+    summary.insert(3, "Cost", summary["Value"] - summary["Gain/Loss"])
+    summary["% Gain/Loss"] = (summary["Gain/Loss"] / summary["Cost"].where(summary["Cost"] != 0) * 100).round(2)
+    summary["% Allocation"] = (summary["Value"] / summary["Value"].sum() * 100).round(2)
+    type_returns = returns_summary[returns_summary["Level"] == "Type"].set_index("Name")
+    for column in ["% XIRR", "% TWR"]:
+        summary[column] = summary["Type"].map(type_returns[column]) if column in type_returns else None
+    return summary
+
+def build_responses(pointer):
+    """
+    Render every API response for one snapshot.
+
+    The snapshot's Parquet output is read once per version; requests are then
+    served from the rendered bytes.
+
+    Args:
+        pointer (dict): Snapshot pointer from `get_latest_snapshot`.
+
+    Returns:
+        dict: Endpoint path to the encoded JSON body.
+    """
+    # pandas loads with the first snapshot, so /metrics scrapes never pay for it
+    import pandas as pd
+
+    portfolio = read_portfolio(pointer["path"])
+    returns_file = get_returns_file(pointer["path"])
+    returns_summary = read_portfolio(returns_file) if os.path.exists(returns_file) else pd.DataFrame(columns=["Level", "Name"])
+    summary = summarize_types(portfolio, returns_summary)
+    overall = returns_summary[returns_summary["Level"] == "Portfolio"]
+
+    value = float(summary["Value"].sum())
+    cost = float(summary["Cost"].sum())
+    totals = {
+        "positions": len(portfolio),
+        "valued_positions": int(summary["Positions"].sum()),
+        "value": value,
+        "cost": cost,
+        "gain_loss": value - cost,
+        "pct_gain_loss": round((value - cost) / cost * 100, 2) if cost else None,
+        "pct_xirr": to_records(overall)[0]["% XIRR"] if len(overall) else None,
+        "pct_twr": to_records(overall)[0]["% TWR"] if len(overall) else None,
+    }
+
+    meta = {"version": pointer["version"], "created": pointer["created"]}
+    bodies = {
+        "/api/positions": {**meta, "positions": to_records(portfolio)},
+        "/api/summary": {**meta, "types": to_records(summary)},
+        "/api/totals": {**meta, "totals": totals},
+    }
+    return {path: json.dumps(body).encode() for path, body in bodies.items()}
+
+class SnapshotCache:
+    """
+    Rendered API responses for the latest snapshot.
+
+    Only the small LATEST pointer is read per request; the portfolio is
+    loaded and the responses rendered again only when a new version is
+    published.
+    """
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        self.snapshot_dir = snapshot_dir
+        self.lock = threading.Lock()
+        self.pointer = None
+        self.responses = {}
+
+    def get(self):
+        """
+        Return the latest snapshot and its rendered responses.
+
+        Returns:
+            tuple: (pointer, dict of endpoint path to body), or (None, {})
+                   before the first snapshot is published.
+        """
+        pointer = get_latest_snapshot(self.snapshot_dir)
+        if pointer is None:
+            return None, {}
+        with self.lock:
+            if self.pointer is None or pointer["version"] != self.pointer["version"]:
+                self.responses = build_responses(pointer)
+                self.pointer = pointer
+            return self.pointer, self.responses
+
+snapshot_cache = SnapshotCache()
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """
+    Request handler for the local API port.
+
+    Serves `/metrics` in the Prometheus text format for a local scraper, and
+    the latest snapshot as JSON under `/api/positions`, `/api/summary` and
+    `/api/totals`. API responses carry an ETag and Last-Modified derived from
+    the snapshot version, so polling clients get 304s until it changes.
+    """
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/metrics":
+            self.send_body(render_metrics().encode(), "text/plain; version=0.0.4; charset=utf-8")
+        elif path.startswith("/api/"):
+            self.send_snapshot(path)
+        else:
+            self.send_error(404, f"Unknown endpoint: {path}")
+
+    def send_snapshot(self, path):
+        """
+        Send an API response for the latest snapshot, or 304 if the client has it.
+
+        Args:
+            path (str): The requested endpoint.
+        """
+        pointer, responses = snapshot_cache.get()
+        if pointer is None:
+            body = json.dumps({"error": "No snapshot has been published yet"}).encode()
+            self.send_body(body, "application/json", status=503)
+            return
+        if path not in responses:
+            self.send_error(404, f"Unknown endpoint: {path}")
+            return
+
+        headers = {
+            "ETag": f'"{pointer["version"]}"',
+            "Last-Modified": formatdate(pointer["created_at"], usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+        if self.is_not_modified(headers["ETag"], pointer["created_at"]):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        self.send_body(responses[path], "application/json", headers=headers)
+
+    def is_not_modified(self, etag, modified_at):
+        """
+        Evaluate the request's conditional headers.
+
+        If-None-Match takes precedence over If-Modified-Since, as in RFC 9110.
+
+        Args:
+            etag (str): Current entity tag, quoted.
+            modified_at (float): Unix time the snapshot was published.
+
+        Returns:
+            bool: True if the client's copy is current.
+        """
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                return int(modified_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_body(self, body, content_type, status=200, headers=None):
+        """
+        Send a complete response.
+
+        Args:
+            body (bytes): The response body.
+            content_type (str): Value of the Content-Type header.
+            status (int): HTTP status code.
+            headers (dict, optional): Extra headers to send.
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapers poll every few seconds; keep the terminal quiet
+        pass
+
+def run_api_server(port=PORT_API):
+    """
+    Serve the API on localhost until interrupted.
+
+    Args:
+        port (int): Port to listen on.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), ApiHandler)
+    print(f"Serving metrics and the portfolio API on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    run_api_server()
@@ -0,0 +1,156 @@
+import pandas as pd
+from pandas.tseries.holiday import USFederalHolidayCalendar
+from pandas.tseries.offsets import CustomBusinessDay, DateOffset, Day
+from calculate_portfolio import normalize_portfolio, price_key
+from price_history import PriceHistoryStore
+from price_providers import MARKET_TYPES, get_provider
+from quote_cache import MARKET_TIMEZONE
+from config import (
+    COMPACT_HISTORY_DAYS,
+    HISTORY_START_YEARS,
+    INPUT_FILE
+)
+
+TRADING_DAY = CustomBusinessDay(calendar=USFederalHolidayCalendar())
+
+def get_calendar(asset_type):
+    """
+    Return the day offset an asset trades on.
+
+    Args:
+        asset_type (str): One of stock, etf or crypto.
+
+    Returns:
+        pd.DateOffset: US business days for equities, every day for crypto.
+    """
+    return Day() if asset_type == "crypto" else TRADING_DAY
+
+def last_complete_day(asset_type, now=None):
+    """
+    Find the most recent day whose close is final.
+
+    Args:
+        asset_type (str): One of stock, etf or crypto.
+        now (pd.Timestamp, optional): Reference time. Defaults to the current time.
+
+    Returns:
+        pd.Timestamp: The last complete trading day (yesterday for crypto).
+    """
+    now = (now or pd.Timestamp.now(tz=MARKET_TIMEZONE)).tz_convert(MARKET_TIMEZONE)
+    today = now.normalize().tz_localize(None)
+    if asset_type == "crypto" or now.hour < 16:
+        today -= Day()
+    return get_calendar(asset_type).rollback(today)
+
+def find_missing_days(asset_type, start, end, coverage):
+    """
+    List the trading days in a range that have not been backfilled.
+
+    Args:
+        asset_type (str): One of stock, etf or crypto.
+        start (pd.Timestamp): First day the history should cover.
+        end (pd.Timestamp): Last day the history should cover.
+        coverage (tuple): (start, end) already covered, or None.
+
+    Returns:
+        pd.DatetimeIndex: Missing trading days in ascending order.
+    """
+    days = pd.date_range(start, end, freq=get_calendar(asset_type))
+    if coverage is None:
+        return days
+    return days[(days < coverage[0]) | (days > coverage[1])]
+
+def get_outputsize(asset_type, missing, end):
+    """
+    Pick the smallest series request that covers every missing day.
+
+    Args:
+        asset_type (str): One of stock, etf or crypto.
+        missing (pd.DatetimeIndex): Missing trading days in ascending order.
+        end (pd.Timestamp): Last day the history should cover.
+
+    Returns:
+        str: "compact" if the oldest gap is within the last
+             COMPACT_HISTORY_DAYS trading days, otherwise "full".
+    """
+    compact_start = end - (COMPACT_HISTORY_DAYS - 1) * get_calendar(asset_type)
+    return "compact" if missing[0] >= compact_start else "full"
+
+def get_history_targets(portfolio, now=None):
+    """
+    Work out how far back each market-priced asset's history should go.
+
+    Args:
+        portfolio (pd.DataFrame): Portfolio with normalized `Type` column.
+        now (pd.Timestamp, optional): Reference time for the default depth.
+
+    Returns:
+        dict: Mapping of (ticker, asset_type) to the first day needed, the
+              earliest purchase date of its lots or HISTORY_START_YEARS back.
+    """
+    now = now or pd.Timestamp.now(tz=MARKET_TIMEZONE)
+    default_start = now.normalize().tz_localize(None) - DateOffset(years=HISTORY_START_YEARS)
+
+    lots = portfolio[portfolio["Ticker"].notna() & portfolio["Type"].isin(MARKET_TYPES)]
+    lots = lots.assign(
+        _key=lots["Ticker"].map(price_key),
+        _start=pd.to_datetime(lots["Purchase Date"], errors="coerce").fillna(default_start)
+    )
+    starts = lots.groupby(["_key", "Type"], sort=False)["_start"].min()
+    return {key: start.normalize() for key, start in starts.items()}
+
+def backfill_history(targets, provider=None, store=None, now=None):
+    """
+    Fill each asset's stored history up to the last complete trading day.
+
+    Only assets with uncovered trading days are requested, using the compact
+    series when the gap is recent. Coverage is saved after every asset, so an
+    interrupted run resumes where it stopped and a nightly run costs one
+    compact call per asset.
+
+    Args:
+        targets (dict): Mapping of (ticker, asset_type) to the first day needed.
+        provider (PriceProvider, optional): Source of daily series. Defaults
+                                            to the configured provider.
+        store (PriceHistoryStore, optional): Destination store.
+        now (pd.Timestamp, optional): Reference time. Defaults to the current time.
+
+    Returns:
+        dict: Counts of "compact" and "full" requests, "current" assets that
+              needed nothing and "failed" assets.
+    """
+    provider = provider or get_provider()
+    store = store or PriceHistoryStore()
+    counts = {"compact": 0, "full": 0, "current": 0, "failed": 0}
+
+    for (ticker, asset_type), start in targets.items():
+        end = last_complete_day(asset_type, now)
+        coverage = store.get_coverage(ticker, asset_type)
+        missing = find_missing_days(asset_type, start, end, coverage)
+        if len(missing) == 0:
+            counts["current"] += 1
+            continue
+
+        outputsize = get_outputsize(asset_type, missing, end)
+        print(f"Backfilling {ticker} ({asset_type}): {len(missing)} missing days, {outputsize} series")
+        closes = provider.get_daily_series(ticker, asset_type, outputsize)
+        counts[outputsize] += 1
+        if closes is None or closes.empty:
+            counts["failed"] += 1
+            continue
+
+        store.merge(ticker, asset_type, closes)
+        # Days after the series' last close stay uncovered so the next run asks for them again
+        covered_start = start if coverage is None else min(start, coverage[0])
+        covered_end = min(end, closes.index.max().normalize())
+        if coverage is not None:
+            covered_end = max(covered_end, coverage[1])
+        store.set_coverage(ticker, asset_type, covered_start, covered_end)
+
+    return counts
+
+if __name__ == "__main__":
+    portfolio = normalize_portfolio(pd.read_csv(INPUT_FILE))
+    counts = backfill_history(get_history_targets(portfolio))
+    print(f"History backfill: {counts['compact']} compact and {counts['full']} full requests, "
+          f"{counts['current']} already current, {counts['failed']} failed")
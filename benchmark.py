@@ -0,0 +1,420 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from calculate_portfolio import (
+    apply_hold_periods,
+    fetch_prices,
+    count_skipped_rows,
+    normalize_portfolio,
+    price_key,
+    print_skipped_rows,
+    value_portfolio
+)
+from portfolio_io import write_portfolio
+from price_providers import PriceProvider
+from returns import apply_lot_returns
+from config import MAX_CONCURRENT_REQUESTS
+
+BENCHMARK_SIZES = [100, 10_000, 1_000_000]
+BENCHMARK_FILE = "benchmark_results.json"
+BASELINE_FILE = "benchmark_baseline.json"
+IMPORT_BENCHMARK_FILE = "import_benchmark.json"
+ENTRY_POINTS = [
+    "main", "calculate_portfolio", "refresher", "api_server", "backfill_history",
+    "risk", "visualize_portfolio", "visualize_budget", "worker_pool",
+]
+HEAVY_MODULES = ["pandas", "numpy", "plotly", "dash", "psutil", "dotenv", "requests", "pyarrow"]
+STAGES = ["load", "prices", "valuation", "hold_periods", "returns", "write"]
+VALUATION_COLUMNS = ["Current Price", "Value", "Gain/Loss", "% Gain/Loss"]
+
+class LatencyProvider(PriceProvider):
+    """
+    Deterministic prices returned after a fixed delay per quote.
+
+    Quotes are resolved on a thread pool of MAX_CONCURRENT_REQUESTS workers,
+    like the live provider, so the latency cost scales with the number of
+    unique tickers rather than the number of rows.
+    """
+
+    name = "latency"
+
+    def __init__(self, latency=0.0, max_workers=MAX_CONCURRENT_REQUESTS):
+        self.latency = latency
+        self.max_workers = max_workers
+
+    def fetch_quote(self, key):
+        """
+        Return a price derived from the ticker after sleeping for `latency`.
+
+        Args:
+            key (tuple): (ticker, asset_type).
+
+        Returns:
+            float: A stable price between 10 and 500.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        return 10 + sum(map(ord, key[0])) % 490
+
+    def fetch(self, requests, on_resolved):
+        prices = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for key, price in zip(requests, executor.map(self.fetch_quote, requests)):
+                prices[key] = price
+                on_resolved(key)
+        return prices
+
+def generate_portfolio(rows, tickers=None, seed=0):
+    """
+    Build a synthetic input portfolio with the same columns as portfolio.csv.
+
+    The mix includes every supported type, a few unsupported ones, missing
+    and malformed purchase dates and mixed-case tickers, so every code path
+    of the pipeline is exercised.
+
+    Args:
+        rows (int): Number of lots.
+        tickers (int, optional): Number of distinct tickers. Defaults to
+                                 about one per 20 lots, capped at 5,000.
+        seed (int): Random seed, so the same size always yields the same file.
+
+    Returns:
+        pd.DataFrame: The synthetic portfolio.
+    """
+    rng = np.random.default_rng(seed)
+    tickers = tickers or min(max(rows // 20, 1), 5_000)
+    symbols = np.array([f"T{index:04d}" for index in range(tickers)])
+    types = rng.choice(
+        ["Stock", "ETF", "Crypto", "Cash", "401k", "HSA", "ESPP", "Bond"],
+        rows,
+        p=[0.45, 0.2, 0.1, 0.08, 0.07, 0.05, 0.049, 0.001]
+    )
+    dates = pd.Timestamp("2012-01-01") + pd.to_timedelta(rng.integers(0, 5_000, rows), unit="D")
+    purchase_dates = pd.Series(dates.strftime("%Y-%m-%d"), dtype=object)
+    purchase_dates[rng.random(rows) < 0.03] = None
+    purchase_dates[rng.random(rows) < 0.01] = "01/02/2020"
+
+    ticker = symbols[rng.integers(0, tickers, rows)]
+    ticker = np.where(rng.random(rows) < 0.1, np.char.lower(ticker), ticker)
+    return pd.DataFrame({
+        "Ticker": ticker,
+        "Type": types,
+        "Quantity": rng.uniform(0.1, 500, rows).round(4),
+        "Cost Basis": rng.uniform(1, 400, rows).round(2),
+        "Purchase Date": purchase_dates,
+        "Liquidity": rng.choice(["Liquid", "Illiquid"], rows),
+    })
+
+def time_pipeline(input_file, output_file, provider):
+    """
+    Run the in-memory calculation pipeline once, timing each stage.
+
+    Args:
+        input_file (str): Path of the input CSV.
+        output_file (str): Path to write the computed portfolio to.
+        provider (PriceProvider): Price source for the price stage.
+
+    Returns:
+        dict: Seconds spent per stage in STAGES.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    def lap(stage):
+        nonlocal started
+        now = time.perf_counter()
+        timings[stage] = now - started
+        started = now
+
+    portfolio = pd.read_csv(input_file)
+    lap("load")
+    portfolio = normalize_portfolio(portfolio)
+    prices = fetch_prices(portfolio, provider)
+    lap("prices")
+    portfolio, valued = value_portfolio(portfolio, prices)
+    lap("valuation")
+    now = pd.Timestamp.now()
+    portfolio = apply_hold_periods(portfolio, valued, now)
+    lap("hold_periods")
+    portfolio, _ = apply_lot_returns(portfolio, valued, now)
+    lap("returns")
+    write_portfolio(portfolio, output_file)
+    lap("write")
+    # Reported after the clock stops so terminal output is not timed as valuation
+    print_skipped_rows(count_skipped_rows(portfolio, valued))
+    return timings
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, latency=0.0, repeat=3, output_format="csv"):
+    """
+    Time the pipeline on synthetic portfolios of each size.
+
+    Each stage reports its best time over `repeat` runs, which is the least
+    noisy estimate of its cost on a shared machine.
+
+    Args:
+        sizes (list): Portfolio sizes in rows.
+        latency (float): Simulated seconds per price request.
+        repeat (int): Runs per size.
+        output_format (str): Extension of the written output ("csv",
+                             "parquet" or "feather").
+
+    Returns:
+        dict: Run metadata and per-size, per-stage timings in seconds.
+    """
+    results = {}
+    provider = LatencyProvider(latency)
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            input_file = os.path.join(directory, f"portfolio_{size}.csv")
+            output_file = os.path.join(directory, f"output_{size}.{output_format}")
+            generate_portfolio(size).to_csv(input_file, index=False)
+
+            runs = [time_pipeline(input_file, output_file, provider) for _ in range(repeat)]
+            results[str(size)] = {stage: min(run[stage] for run in runs) for stage in STAGES}
+            results[str(size)]["total"] = sum(results[str(size)][stage] for stage in STAGES)
+            print(f"{size:>9,} rows: " + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in results[str(size)].items()))
+
+    return {
+        "created": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "latency": latency,
+        "repeat": repeat,
+        "format": output_format,
+        "results": results,
+    }
+
+def value_portfolio_rows(portfolio, prices):
+    """
+    Value a portfolio one row at a time, as calculate_portfolio did before it was vectorized.
+
+    Kept as the reference `check_valuation` compares `value_portfolio` with.
+
+    Args:
+        portfolio (pd.DataFrame): Portfolio with normalized `Type` column.
+        prices (dict): Mapping of (ticker, type) to price from `fetch_prices`.
+
+    Returns:
+        tuple: (portfolio with the computed columns, boolean mask of valued rows)
+    """
+    portfolio = portfolio.copy()
+    for column in VALUATION_COLUMNS:
+        portfolio[column] = 0.0
+    valued = np.zeros(len(portfolio), dtype=bool)
+
+    for position, (index, row) in enumerate(portfolio.iterrows()):
+        ticker = row['Ticker']
+        asset_type = row['Type']
+        quantity = row['Quantity']
+        cost_basis = row.get('Cost Basis', 0)
+
+        if pd.isna(ticker) or pd.isna(asset_type) or pd.isna(quantity):
+            continue
+
+        if asset_type == "cash":
+            price, value, gain_loss, percentage_gain_loss = 1, quantity, 0, 0
+        elif asset_type in ["401k", "hsa"]:
+            price = 1
+            value = price * quantity
+            gain_loss = value - cost_basis
+            percentage_gain_loss = (gain_loss / cost_basis) * 100 if cost_basis > 0 else 100
+        else:
+            price = prices.get((price_key(ticker), asset_type))
+            if price is None:
+                continue
+            value = price * quantity
+            gain_loss = value - (cost_basis * quantity) if cost_basis > 0 else value
+            percentage_gain_loss = (gain_loss / (cost_basis * quantity)) * 100 if cost_basis > 0 else 100
+
+        portfolio.loc[index, VALUATION_COLUMNS] = [price, value, gain_loss, percentage_gain_loss]
+        valued[position] = True
+    return portfolio, valued
+
+def check_valuation(sizes=(100, 10_000), seed=0):
+    """
+    Check that `value_portfolio` matches the row-by-row reference.
+
+    The synthetic portfolios get some missing tickers and quantities and
+    zero or missing cost bases on top of `generate_portfolio`'s mix, so
+    every branch of the valuation is compared.
+
+    Args:
+        sizes (list): Portfolio sizes in rows.
+        seed (int): Random seed of the synthetic portfolios.
+
+    Returns:
+        bool: True if every size matched.
+    """
+    provider = LatencyProvider()
+    matched = True
+    for size in sizes:
+        rng = np.random.default_rng(seed)
+        portfolio = generate_portfolio(size, seed=seed)
+        portfolio.loc[rng.random(size) < 0.02, "Ticker"] = None
+        portfolio.loc[rng.random(size) < 0.02, "Quantity"] = np.nan
+        portfolio.loc[rng.random(size) < 0.05, "Cost Basis"] = 0.0
+        portfolio.loc[rng.random(size) < 0.02, "Cost Basis"] = np.nan
+        portfolio = normalize_portfolio(portfolio)
+
+        # Both versions report every skipped row; only the numbers matter here
+        with contextlib.redirect_stdout(io.StringIO()):
+            prices = fetch_prices(portfolio, provider)
+            expected, expected_valued = value_portfolio_rows(portfolio, prices)
+            actual, actual_valued = value_portfolio(portfolio, prices)
+
+        mismatched = [
+            column for column in VALUATION_COLUMNS
+            if not np.allclose(actual[column].astype(float), expected[column].astype(float), equal_nan=True)
+        ]
+        if not np.array_equal(actual_valued, expected_valued):
+            mismatched.append("valued rows")
+        print(f"{size:>9,} rows: " + (f"mismatch in {', '.join(mismatched)}" if mismatched else "matches the row-by-row valuation"))
+        matched = matched and not mismatched
+    return matched
+
+def time_imports(module):
+    """
+    Measure the cost of importing one module in a fresh interpreter.
+
+    Args:
+        module (str): Name of the module to import.
+
+    Returns:
+        tuple: (cumulative import seconds, list of HEAVY_MODULES it loaded)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        if total.strip().isdigit():
+            cumulative[name.strip()] = int(total) / 1e6
+    return cumulative[module], [name for name in HEAVY_MODULES if name in cumulative]
+
+def run_import_benchmarks(modules=ENTRY_POINTS, repeat=5):
+    """
+    Record `python -X importtime` cost for every entry point.
+
+    Each module keeps its best time over `repeat` fresh interpreters, after
+    the first run has warmed the file system cache.
+
+    Args:
+        modules (list): Entry point modules to import.
+        repeat (int): Interpreters started per module.
+
+    Returns:
+        dict: Run metadata, per-module import seconds in the same shape as
+              `run_benchmarks` (so `compare` works on it) and the heavy
+              modules each entry point pulls in.
+    """
+    results = {}
+    heavy = {}
+    for module in modules:
+        time_imports(module)
+        runs = [time_imports(module) for _ in range(repeat)]
+        results[module] = {"import": min(seconds for seconds, _ in runs)}
+        heavy[module] = runs[0][1]
+        print(f"{module:<20} {results[module]['import'] * 1000:>8.1f} ms  loads {', '.join(heavy[module]) or 'nothing heavy'}")
+
+    return {
+        "created": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+        "heavy_modules": heavy,
+    }
+
+def compare_benchmarks(current, baseline, threshold=0.2, min_seconds=0.005):
+    """
+    Compare two benchmark runs and list the stages that got slower.
+
+    Args:
+        current (dict): Output of `run_benchmarks` for the change under test.
+        baseline (dict): Output of `run_benchmarks` for the reference.
+        threshold (float): Allowed relative slowdown (0.2 = 20%).
+        min_seconds (float): Stages faster than this in both runs are ignored
+                             as timer noise.
+
+    Returns:
+        list: (size, stage, baseline seconds, current seconds) for each regression.
+    """
+    regressions = []
+    for size, stages in current["results"].items():
+        for stage, seconds in stages.items():
+            reference = baseline["results"].get(size, {}).get(stage)
+            if reference is None or max(seconds, reference) < min_seconds:
+                continue
+            change = (seconds - reference) / reference if reference else float("inf")
+            marker = "REGRESSION" if change > threshold else ""
+            print(f"{size:>9} {stage:<13} {reference:>9.3f}s -> {seconds:>9.3f}s {change:>+8.1%} {marker}")
+            if change > threshold:
+                regressions.append((size, stage, reference, seconds))
+    return regressions
+
+def parse_benchmark_args():
+    """
+    Parse command-line arguments for the benchmark suite.
+
+    Returns:
+        argparse.Namespace: Parsed arguments for the chosen command.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the calculate_portfolio pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Time every stage and write the results as JSON")
+    run.add_argument("--sizes", type=int, nargs="+", default=BENCHMARK_SIZES, help="Portfolio sizes in rows")
+    run.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per price request")
+    run.add_argument("--repeat", type=int, default=3, help="Runs per size; the fastest is kept")
+    run.add_argument("--format", choices=["csv", "parquet", "feather"], default="csv", help="Output format to write")
+    run.add_argument("--output", default=BENCHMARK_FILE, help="Where to write the results")
+
+    imports = commands.add_parser("imports", help="Time importing every entry point with python -X importtime")
+    imports.add_argument("--modules", nargs="+", default=ENTRY_POINTS, help="Entry point modules to import")
+    imports.add_argument("--repeat", type=int, default=5, help="Interpreters per module; the fastest is kept")
+    imports.add_argument("--output", default=IMPORT_BENCHMARK_FILE, help="Where to write the results")
+
+    valuation = commands.add_parser("check-valuation", help="Compare the vectorized valuation with the row-by-row one")
+    valuation.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000], help="Portfolio sizes in rows")
+    valuation.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic portfolios")
+
+    compare = commands.add_parser("compare", help="Flag stages slower than a stored baseline")
+    compare.add_argument("current", nargs="?", default=BENCHMARK_FILE, help="Results to check")
+    compare.add_argument("baseline", nargs="?", default=BASELINE_FILE, help="Reference results")
+    compare.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_benchmark_args()
+    if args.command in ["run", "imports"]:
+        if args.command == "run":
+            report = run_benchmarks(args.sizes, args.latency, args.repeat, args.format)
+        else:
+            report = run_import_benchmarks(args.modules, args.repeat)
+        with open(args.output, "w") as results_file:
+            json.dump(report, results_file, indent=2)
+        print(f"Benchmark results saved to {args.output}")
+    elif args.command == "check-valuation":
+        sys.exit(0 if check_valuation(args.sizes, args.seed) else 1)
+    else:
+        with open(args.current) as current_file, open(args.baseline) as baseline_file:
+            regressions = compare_benchmarks(json.load(current_file), json.load(baseline_file), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("No regressions against the baseline")
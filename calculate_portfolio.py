@@ -1,136 +1,648 @@
+import argparse
+import os
+import time
+import numpy as np
 import pandas as pd
-import requests
-from datetime import datetime
-from utils import (
-    ALPHA_VANTAGE_API_KEY,
+from metrics import registry
+from portfolio_io import (
+    PortfolioWriter,
+    atomic_path,
+    get_progress_file,
+    get_report_file,
+    get_returns_file,
+    read_portfolio,
+    write_portfolio
+)
+from price_providers import get_provider
+from returns import aggregate_flows, apply_lot_returns, summarize_returns
+from run_report import STAGES, RunReport
+from snapshots import calculation_lock, publish_snapshot
+from config import (
+    CHUNK_SIZE,
     INPUT_FILE,
     TEMP_FILE,
     LONG_TERM_HOLD_YEARS
 )
 
-def get_price(ticker, asset_type):
+def price_key(ticker):
+    """
+    Normalize a ticker so every lot of the same asset shares one quote.
+
+    Args:
+        ticker (str): The asset ticker symbol as written in the CSV.
+
+    Returns:
+        str: The stripped, upper-cased ticker.
+    """
+    return str(ticker).strip().upper()
+
+def get_price_keys(portfolio):
     """
-    Fetch the current price for a given asset type using Alpha Vantage API.
+    List the (ticker, type) pair of every row that needs a quote.
 
     Args:
-        ticker (str): The asset ticker symbol.
-        asset_type (str): The type of asset (e.g., stock, etf, crypto, etc.).
+        portfolio (pd.DataFrame): Portfolio with normalized `Type` column.
 
     Returns:
-        float: The current price of the asset, or 0 if there's an error.
+        list: One (ticker, type) pair per priced row, duplicates included.
+    """
+    pending = portfolio[
+        portfolio["Ticker"].notna()
+        & portfolio["Quantity"].notna()
+        & ~portfolio["Type"].isin(["cash", "401k", "hsa"])
+    ]
+    return list(zip(pending["Ticker"].map(price_key), pending["Type"]))
+
+def fetch_prices(portfolio, provider=None, progress=None):
     """
-    if asset_type in ["cash", "401k", "hsa", "espp"]:
-        return 1
+    Resolve the current price of every priced ticker in one provider batch.
+
+    Lots are deduplicated first so each (ticker, type) pair is requested
+    exactly once, however many rows it appears on.
+
+    Args:
+        portfolio (pd.DataFrame): Portfolio with normalized `Type` column.
+        provider (PriceProvider, optional): Price source. Defaults to the
+                                            configured PRICE_PROVIDER.
+        progress (function, optional): Called as `progress(done, total, key)`
+                                       each time a quote is resolved.
+
+    Returns:
+        dict: Mapping of (ticker, type) to price (None for unsupported types).
+    """
+    provider = provider or get_provider()
+    keys = get_price_keys(portfolio)
+    if not keys:
+        return {}
+
+    unique_keys = list(dict.fromkeys(keys))
+    print(f"Fetching {len(unique_keys)} unique quotes for {len(keys)} lots "
+          f"({len(keys) - len(unique_keys)} API calls saved)")
+
+    return provider.get_prices(unique_keys, progress)
+
+def value_portfolio(portfolio, prices):
+    """
+    Compute price, value and gain/loss columns for every row at once.
+
+    Rows missing a ticker or quantity, and market-priced rows whose type has
+    no price source, are left at zero; `count_skipped_rows` tells them apart.
+
+    Args:
+        portfolio (pd.DataFrame): Portfolio with normalized `Type` column.
+        prices (dict): Mapping of (ticker, type) to price from `fetch_prices`.
 
-    url, params = None, None
-    if asset_type in ["stock", "etf"]:
-        url = "https://www.alphavantage.co/query"
-        params = {
-            "function": "GLOBAL_QUOTE",
-            "symbol": ticker,
-            "apikey": ALPHA_VANTAGE_API_KEY,
-        }
-    elif asset_type == "crypto":
-        url = "https://www.alphavantage.co/query"
-        params = {
-            "function": "CURRENCY_EXCHANGE_RATE",
-            "from_currency": ticker.upper(),
-            "to_currency": "USD",
-            "apikey": ALPHA_VANTAGE_API_KEY,
-        }
+    Returns:
+        tuple: (portfolio with the computed columns, boolean mask of valued rows)
+    """
+    portfolio = portfolio.copy()
+    ticker = portfolio['Ticker']
+    asset_type = portfolio['Type']
+    quantity = portfolio['Quantity'].astype(float)
+    if 'Cost Basis' in portfolio:
+        cost_basis = portfolio['Cost Basis'].astype(float)
     else:
-        print(f"Unsupported asset type: {asset_type}")
+        cost_basis = pd.Series(0.0, index=portfolio.index)
+
+    is_cash = (asset_type == "cash").to_numpy()
+    is_fixed = asset_type.isin(["401k", "hsa"]).to_numpy()
+    has_cost = (cost_basis > 0).to_numpy()
+    market_price = pd.Series(
+        [prices.get((price_key(t), a)) for t, a in zip(ticker, asset_type)],
+        index=portfolio.index,
+        dtype=float
+    ).to_numpy()
+
+    complete = (ticker.notna() & quantity.notna()).to_numpy()
+    unpriced = complete & ~is_cash & ~is_fixed & np.isnan(market_price)
+    valued = complete & ~unpriced
+
+    quantity = quantity.to_numpy()
+    cost_basis = cost_basis.to_numpy()
+    invested = cost_basis * quantity
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price = np.select([is_cash | is_fixed], [1.0], market_price)
+        value = np.select([is_cash], [quantity], price * quantity)
+        gain_loss = np.select(
+            [is_cash, is_fixed, has_cost],
+            [0.0, value - cost_basis, value - invested],
+            value
+        )
+        percentage_gain_loss = np.select(
+            [is_cash, is_fixed & has_cost, is_fixed, has_cost],
+            [0.0, (gain_loss / cost_basis) * 100, 100.0, (gain_loss / invested) * 100],
+            100.0
+        )
+
+    portfolio['Current Price'] = np.where(valued, price, 0.0)
+    portfolio['Value'] = np.where(valued, value, 0.0)
+    portfolio['Gain/Loss'] = np.where(valued, gain_loss, 0.0)
+    portfolio['% Gain/Loss'] = np.where(valued, percentage_gain_loss, 0.0)
+    return portfolio, valued
+
+def count_skipped_rows(portfolio, valued):
+    """
+    Count the rows `value_portfolio` left unvalued, by reason.
+
+    Args:
+        portfolio (pd.DataFrame): The valued portfolio.
+        valued (np.ndarray): Boolean mask of valued rows.
+
+    Returns:
+        pd.Series: Row counts indexed by "missing data" or by the asset type
+                   that has no price source.
+    """
+    skipped = portfolio[~valued]
+    missing = skipped['Ticker'].isna() | skipped['Quantity'].isna()
+    return skipped['Type'].where(~missing, "missing data").value_counts()
+
+def print_skipped_rows(counts):
+    """
+    Report the skipped rows once per reason rather than once per row.
+
+    Args:
+        counts (pd.Series): Counts from `count_skipped_rows`.
+    """
+    for reason, count in counts.items():
+        if reason == "missing data":
+            print(f"Skipping {count:,} rows due to a missing ticker or quantity")
+        else:
+            print(f"Skipping {count:,} rows with unknown asset type '{reason}'")
+
+def compute_hold_periods(purchase_dates, now):
+    """
+    Classify every lot's holding period against one reference time.
+
+    Dates are parsed in a single vectorized pass; anything that is not
+    YYYY-MM-DD is treated as invalid.
+
+    Args:
+        purchase_dates (pd.Series): Raw `Purchase Date` values.
+        now (pd.Timestamp): Reference time shared by the whole run.
+
+    Returns:
+        pd.DataFrame: `Long-Term Hold` ("Green", "Red", "Invalid Date" or
+                      "No Date"), `Days Held`, `Days Until Long-Term` and
+                      `Long-Term Date` columns aligned to `purchase_dates`.
+    """
+    missing = purchase_dates.isna()
+    parsed = pd.to_datetime(
+        purchase_dates.where(missing, purchase_dates.astype(str)),
+        format="%Y-%m-%d",
+        errors="coerce"
+    )
+
+    # A lot is long-term once it has been held more than LONG_TERM_HOLD_YEARS * 365 days
+    threshold_days = int(LONG_TERM_HOLD_YEARS * 365)
+    days_held = (now - parsed).dt.days.astype("Int64")
+    long_term_date = parsed + pd.Timedelta(days=threshold_days + 1)
+
+    label = np.select(
+        [missing.to_numpy(), parsed.isna().to_numpy(), days_held.gt(threshold_days).fillna(False).to_numpy(dtype=bool)],
+        ["No Date", "Invalid Date", "Green"],
+        "Red"
+    )
+    return pd.DataFrame({
+        'Long-Term Hold': label,
+        'Days Held': days_held,
+        'Days Until Long-Term': (threshold_days + 1 - days_held).clip(lower=0),
+        'Long-Term Date': long_term_date.dt.strftime("%Y-%m-%d"),
+    }, index=purchase_dates.index)
+
+def normalize_portfolio(portfolio):
+    """
+    Normalize the free-text input columns.
+
+    Args:
+        portfolio (pd.DataFrame): The raw input portfolio.
+
+    Returns:
+        pd.DataFrame: The portfolio with lower-cased `Type` and `Liquidity`.
+    """
+    portfolio['Type'] = portfolio['Type'].fillna('').astype(str).str.lower()
+    portfolio['Liquidity'] = portfolio['Liquidity'].fillna('').astype(str).str.lower()
+    return portfolio
+
+def apply_hold_periods(portfolio, valued, now):
+    """
+    Add the hold-period columns for every valued row.
+
+    Args:
+        portfolio (pd.DataFrame): The valued portfolio.
+        valued (np.ndarray): Boolean mask of rows that were valued.
+        now (pd.Timestamp): Reference time shared by the whole run.
+
+    Returns:
+        pd.DataFrame: The portfolio with hold-period columns; rows that were
+                      skipped get an empty `Long-Term Hold` label.
+    """
+    purchase_dates = portfolio['Purchase Date'] if 'Purchase Date' in portfolio else pd.Series('', index=portfolio.index)
+    hold_periods = compute_hold_periods(purchase_dates[valued], now)
+    for column in hold_periods.columns:
+        portfolio[column] = hold_periods[column]
+    portfolio['Long-Term Hold'] = portfolio['Long-Term Hold'].fillna('')
+    return portfolio
+
+def hash_rows(portfolio):
+    """
+    Fingerprint each input row so unchanged lots can be recognized later.
+
+    Args:
+        portfolio (pd.DataFrame): The raw input portfolio.
+
+    Returns:
+        np.ndarray: One uint64 hash per row.
+    """
+    return pd.util.hash_pandas_object(portfolio, index=False).to_numpy()
+
+def get_state_file(output_file):
+    """
+    Return the path of the incremental state stored next to an output file.
+
+    Args:
+        output_file (str): Path of the processed portfolio.
+
+    Returns:
+        str: Path of the `.state.npz` sidecar.
+    """
+    return os.path.splitext(output_file)[0] + ".state.npz"
+
+def save_returns(output_file, flows, now):
+    """
+    Summarize returns per ticker, type and portfolio and save them.
+
+    Args:
+        output_file (str): Path of the processed portfolio.
+        flows (pd.DataFrame): Lot flows from `apply_lot_returns`.
+        now (pd.Timestamp): Reference time shared by the whole run.
+
+    Returns:
+        pd.DataFrame: The saved summary.
+    """
+    summary = summarize_returns(flows, now)
+    write_portfolio(summary, get_returns_file(output_file))
+    return summary
+
+def print_returns(summary):
+    """
+    Print the whole portfolio's annualized returns.
+
+    Args:
+        summary (pd.DataFrame): Output of `save_returns`.
+    """
+    total = summary[summary["Level"] == "Portfolio"]
+    if not total.empty:
+        print(f"Annualized return: {total['% XIRR'].iloc[0]:.2f}% money-weighted (XIRR), "
+              f"{total['% TWR'].iloc[0]:.2f}% time-weighted")
+
+def get_failed_tickers(prices):
+    """
+    List the market-priced quotes that could not be resolved.
+
+    Args:
+        prices (dict): Mapping of (ticker, type) to price from `fetch_prices`.
+
+    Returns:
+        list: "TICKER (type)" labels of quotes that came back as 0.
+    """
+    return sorted(f"{ticker} ({asset_type})" for (ticker, asset_type), price in prices.items() if price == 0)
+
+def print_timings(report):
+    """
+    Print how long each stage of a run took.
+
+    Args:
+        report (dict): The run report.
+    """
+    timings = report["timings"]
+    print(f"Finished in {timings['total']:.2f}s: " + ", ".join(f"{stage} {timings[stage]:.2f}s" for stage in STAGES))
+
+def record_valuation(report, type_values):
+    """
+    Publish the outcome of a successful valuation to the shared metrics.
+
+    Args:
+        report (dict): The run report.
+        type_values (pd.Series): Total value per `Type`.
+    """
+    registry.set("portfolio_last_valuation_timestamp_seconds", time.time())
+    registry.set("portfolio_value_dollars", report["total_value"], type="total")
+    for asset_type, value in type_values.items():
+        registry.set("portfolio_value_dollars", value, type=asset_type)
+    for stage, seconds in report["timings"].items():
+        registry.set("portfolio_calculation_stage_seconds", seconds, stage=stage)
+    registry.flush()
+
+def load_state(output_file):
+    """
+    Load the previous run's output together with its row hashes.
+
+    Args:
+        output_file (str): Path of the processed portfolio.
+
+    Returns:
+        tuple: (previous output, row hashes, valued mask), or None if there
+               is no usable state from a previous run.
+    """
+    state_file = get_state_file(output_file)
+    if not (os.path.exists(output_file) and os.path.exists(state_file)):
+        return None
+
+    with np.load(state_file) as state:
+        hashes, valued = state["hashes"], state["valued"]
+    previous = read_portfolio(output_file)
+    if len(previous) != len(hashes):
         return None
+    return previous, hashes, valued
 
-    response = requests.get(url, params=params)
-    data = response.json()
+def save_state(output_file, hashes, valued):
+    """
+    Store row hashes and the valued mask next to the output file.
 
-    try:
-        if asset_type in ["stock", "etf"]:
-            return float(data["Global Quote"]["05. price"])
-        elif asset_type == "crypto":
-            return float(data["Realtime Currency Exchange Rate"]["5. Exchange Rate"])
-    except KeyError:
-        print(f"Error fetching price for {ticker} ({asset_type}). Response: {data}")
-        return 0
+    Args:
+        output_file (str): Path of the processed portfolio.
+        hashes (np.ndarray): Input row hashes, aligned with the output rows.
+        valued (np.ndarray): Boolean mask of rows that were valued.
+    """
+    with atomic_path(get_state_file(output_file)) as temp_path:
+        with open(temp_path, "wb") as state_file:
+            np.savez(state_file, hashes=hashes, valued=valued)
 
-def calculate_portfolio(input_file, output_file):
+def find_reusable_rows(portfolio, hashes, state, provider):
+    """
+    Match input rows against the previous run.
+
+    A row is reused when an identical input row exists in the previous run
+    and, if that row was priced, the provider still holds a fresh quote.
+
+    Args:
+        portfolio (pd.DataFrame): Portfolio with normalized `Type` column.
+        hashes (np.ndarray): Hashes of the raw input rows.
+        state (tuple): The result of `load_state`.
+        provider (PriceProvider): Price source used to check quote freshness.
+
+    Returns:
+        np.ndarray: Position in the previous output for each reusable row,
+                    -1 for rows that must be recomputed.
+    """
+    _, previous_hashes, previous_valued = state
+    lookup = pd.Series(np.arange(len(previous_hashes)), index=previous_hashes)
+    lookup = lookup[~lookup.index.duplicated()]
+    positions = lookup.reindex(hashes).fillna(-1).astype(int).to_numpy()
+
+    # Rows skipped last time will be skipped again, so only priced rows need a fresh quote
+    priced = (positions >= 0) & previous_valued[np.maximum(positions, 0)]
+    keys = list(zip(portfolio["Ticker"].map(price_key), portfolio["Type"]))
+    freshness = {key: provider.is_fresh(*key) for key in dict.fromkeys(
+        key for key, is_priced in zip(keys, priced) if is_priced
+    )}
+    expired = np.array([is_priced and not freshness[key] for key, is_priced in zip(keys, priced)], dtype=bool)
+    return np.where(expired, -1, positions)
+
+def calculate_portfolio(input_file, output_file, provider=None, incremental=False):
     """
     Process a portfolio CSV file, fetch current prices, and calculate stats.
 
+    In incremental mode, rows whose input is unchanged since the previous run
+    and whose quote is still fresh are carried forward from the previous
+    output; only new, edited or expired rows are priced and valued again.
+    Hold periods and returns are always refreshed since they depend on the
+    current date. Stage timings and fetch counters are saved as a JSON run
+    report next to the output, and the current stage and quote count are
+    kept in a progress file beside it while the run is going.
+
     Args:
         input_file (str): Path to the input CSV file containing the portfolio.
-        output_file (str): Path to save the processed portfolio CSV.
+        output_file (str): Path to save the processed portfolio. The format
+                           (Parquet, Feather or CSV) follows the extension.
+        provider (PriceProvider, optional): Price source. Defaults to the
+                                            configured PRICE_PROVIDER.
+        incremental (bool): Reuse unchanged rows from the previous run.
+
+    Returns:
+        dict: The run report, or None if the portfolio is empty.
     """
+    provider = provider or get_provider()
+    provider.reset_stats()
+    report = RunReport("incremental" if incremental else "full", input_file, output_file, get_progress_file(output_file))
+
     # Load portfolio data
-    portfolio = pd.read_csv(input_file)
+    with report.stage("load"):
+        portfolio = pd.read_csv(input_file)
 
-    if portfolio.empty:
-        print("Portfolio is empty. Check your CSV file.")
-        return
+        if portfolio.empty:
+            print("Portfolio is empty. Check your CSV file.")
+            return None
 
-    # Initialize columns
-    portfolio['Type'] = portfolio['Type'].fillna('').astype(str).str.lower()
-    portfolio['Liquidity'] = portfolio['Liquidity'].fillna('').astype(str).str.lower()
-    portfolio['Current Price'] = 0
-    portfolio['Value'] = 0
-    portfolio['Gain/Loss'] = 0
-    portfolio['% Gain/Loss'] = 0
-    portfolio['Long-Term Hold'] = ''
-
-    total_value = 0
-
-    for index, row in portfolio.iterrows():
-        ticker = row['Ticker']
-        asset_type = row['Type']
-        quantity = row['Quantity']
-        cost_basis = row.get('Cost Basis', 0)
-        purchase_date = row.get('Purchase Date', '')
-
-        if pd.isna(ticker) or pd.isna(asset_type) or pd.isna(quantity):
-            print(f"Skipping row {index} due to missing data: {row}")
-            continue
-
-        # Handle different asset types
-        if asset_type == "cash":
-            price, value, gain_loss, percentage_gain_loss = 1, quantity, 0, 0
-        elif asset_type in ["401k", "hsa"]:
-            price = 1
-            value = price * quantity
-            gain_loss = value - cost_basis
-            percentage_gain_loss = (gain_loss / cost_basis) * 100 if cost_basis > 0 else 100
+        hashes = hash_rows(portfolio)
+        portfolio = normalize_portfolio(portfolio)
+        state = load_state(output_file) if incremental else None
+
+    # Find rows that can be carried forward from the previous run, then
+    # resolve all remaining quotes up front
+    with report.stage("fetch"):
+        if state is not None:
+            positions = find_reusable_rows(portfolio, hashes, state, provider)
         else:
-            price = get_price(ticker, asset_type)
-            if price is None:
-                print(f"Unknown asset type for {ticker}. Skipping.")
-                continue
-            value = price * quantity
-            gain_loss = value - (cost_basis * quantity) if cost_basis > 0 else value
-            percentage_gain_loss = (gain_loss / (cost_basis * quantity)) * 100 if cost_basis > 0 else 100
-
-        total_value += value
-
-        # Determine long-term hold status
-        if not pd.isna(purchase_date):
-            try:
-                purchase_date_obj = datetime.strptime(str(purchase_date), "%Y-%m-%d")
-                hold_duration_years = (datetime.now() - purchase_date_obj).days / 365
-                long_term_hold = "Green" if hold_duration_years > LONG_TERM_HOLD_YEARS else "Red"
-            except ValueError:
-                long_term_hold = "Invalid Date"
+            positions = np.full(len(portfolio), -1)
+        reused = positions >= 0
+        if incremental:
+            print(f"Carrying forward {reused.sum()} unchanged rows, recomputing {(~reused).sum()}")
+
+        recompute = portfolio[~reused]
+        prices = fetch_prices(recompute, provider, report.quote_resolved)
+
+    # Value every row against the price map
+    with report.stage("compute"):
+        recomputed, recomputed_valued = value_portfolio(recompute, prices)
+
+        valued = np.zeros(len(portfolio), dtype=bool)
+        valued[~reused] = recomputed_valued
+        if reused.any():
+            previous, _, previous_valued = state
+            carried = previous.iloc[positions[reused]].set_axis(portfolio.index[reused])
+            valued[reused] = previous_valued[positions[reused]]
+            # With nothing to recompute (the usual no-change run) the carried rows are the whole portfolio
+            portfolio = pd.concat([carried, recomputed]).loc[portfolio.index] if len(recomputed) else carried
         else:
-            long_term_hold = "No Date"
+            portfolio = recomputed
+        total_value = portfolio.loc[valued, 'Value'].sum()
 
-        # Update portfolio data
-        portfolio.at[index, 'Current Price'] = price
-        portfolio.at[index, 'Value'] = value
-        portfolio.at[index, 'Gain/Loss'] = gain_loss
-        portfolio.at[index, '% Gain/Loss'] = percentage_gain_loss
-        portfolio.at[index, 'Long-Term Hold'] = long_term_hold
+        # Determine long-term hold status and returns against a single reference time
+        now = pd.Timestamp.now()
+        portfolio = apply_hold_periods(portfolio, valued, now)
+        portfolio, flows = apply_lot_returns(portfolio, valued, now)
+    print_skipped_rows(count_skipped_rows(recomputed, recomputed_valued))
 
     # Save updated portfolio
-    portfolio.to_csv(output_file, index=False)
+    with report.stage("save"):
+        write_portfolio(portfolio, output_file)
+        save_state(output_file, hashes, valued)
+        returns_summary = save_returns(output_file, flows, now)
+
+    report.update(
+        rows=len(portfolio),
+        skipped_rows=int((~valued).sum()),
+        unique_quotes=len(prices),
+        failed_tickers=get_failed_tickers(prices),
+        total_value=float(total_value),
+        **provider.get_stats()
+    )
+    if incremental:
+        report.update(reused_rows=int(reused.sum()))
+    report.save(get_report_file(output_file))
+    record_valuation(report.data, portfolio.loc[valued].groupby("Type")["Value"].sum())
+
     print(f"Portfolio saved to {output_file}")
+    print(f"Total value: ${total_value:,.2f}")
+    print_returns(returns_summary)
+    if provider.summary():
+        print(provider.summary())
+    print_timings(report.data)
+    return report.data
+
+def calculate_portfolio_streaming(input_file, output_file, provider=None, chunk_size=CHUNK_SIZE):
+    """
+    Process a portfolio CSV too large to hold in memory, one chunk at a time.
+
+    A first pass reads only the key columns to build the shared price map;
+    a second pass values each chunk against it and appends it to the output,
+    so peak memory depends on `chunk_size` rather than on the file size.
+    The returns summary is built from each chunk's flows, combined per asset
+    and purchase day.
+
+    Args:
+        input_file (str): Path to the input CSV file containing the portfolio.
+        output_file (str): Path to save the processed portfolio. The format
+                           (Parquet, Feather or CSV) follows the extension.
+        provider (PriceProvider, optional): Price source. Defaults to the
+                                            configured PRICE_PROVIDER.
+        chunk_size (int): Number of rows to read and value at a time.
+
+    Returns:
+        dict: The run report, or None if the portfolio is empty.
+    """
+    provider = provider or get_provider()
+    provider.reset_stats()
+    report = RunReport("streaming", input_file, output_file, get_progress_file(output_file))
+
+    # First pass: collect every (ticker, type) pair that needs a quote
+    row_count = 0
+    lot_count = 0
+    unique_keys = {}
+    with report.stage("load"):
+        for chunk in pd.read_csv(input_file, usecols=["Ticker", "Type", "Quantity"], chunksize=chunk_size):
+            chunk["Type"] = chunk["Type"].fillna('').astype(str).str.lower()
+            keys = get_price_keys(chunk)
+            row_count += len(chunk)
+            lot_count += len(keys)
+            unique_keys.update(dict.fromkeys(keys))
+
+    # Stop before the writer replaces the last good output with an empty file
+    if row_count == 0:
+        print("Portfolio is empty. Check your CSV file.")
+        return None
+
+    with report.stage("fetch"):
+        print(f"Fetching {len(unique_keys)} unique quotes for {lot_count} lots "
+              f"({lot_count - len(unique_keys)} API calls saved)")
+        prices = provider.get_prices(list(unique_keys), report.quote_resolved)
+
+    # Second pass: value each chunk against the shared price map
+    now = pd.Timestamp.now()
+    totals = {"rows": 0, "valued": 0, "value": 0.0, "gain_loss": 0.0}
+    type_values = pd.Series(dtype=float)
+    skipped = pd.Series(dtype=int)
+    chunk_flows = []
+    with PortfolioWriter(output_file) as writer:
+        chunks = iter(pd.read_csv(input_file, chunksize=chunk_size))
+        while True:
+            with report.stage("load"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+
+            with report.stage("compute"):
+                chunk, valued = value_portfolio(normalize_portfolio(chunk), prices)
+                chunk = apply_hold_periods(chunk, valued, now)
+                chunk, flows = apply_lot_returns(chunk, valued, now)
+                chunk_flows.append(aggregate_flows(flows))
+            with report.stage("save"):
+                writer.write(chunk)
+
+            totals["rows"] += len(chunk)
+            totals["valued"] += int(valued.sum())
+            totals["value"] += chunk.loc[valued, 'Value'].sum()
+            totals["gain_loss"] += chunk.loc[valued, 'Gain/Loss'].sum()
+            type_values = type_values.add(chunk.loc[valued].groupby("Type")["Value"].sum(), fill_value=0)
+            skipped = skipped.add(count_skipped_rows(chunk, valued), fill_value=0)
+
+    print_skipped_rows(skipped.astype(int))
+
+    with report.stage("save"):
+        # The streamed output has no row hashes, so an older incremental state no longer applies
+        state_file = get_state_file(output_file)
+        if os.path.exists(state_file):
+            os.remove(state_file)
+
+        returns_summary = save_returns(output_file, pd.concat(chunk_flows), now)
+
+    report.update(
+        rows=totals["rows"],
+        skipped_rows=totals["rows"] - totals["valued"],
+        unique_quotes=len(prices),
+        failed_tickers=get_failed_tickers(prices),
+        total_value=float(totals["value"]),
+        **provider.get_stats()
+    )
+    report.save(get_report_file(output_file))
+    record_valuation(report.data, type_values)
+
+    print(f"Portfolio saved to {output_file}")
+    print(f"Rows: {totals['rows']:,} ({totals['rows'] - totals['valued']:,} skipped)")
+    print(f"Total value: ${totals['value']:,.2f} (gain/loss ${totals['gain_loss']:,.2f})")
+    print_returns(returns_summary)
+    if provider.summary():
+        print(provider.summary())
+    print_timings(report.data)
+    return report.data
+
+def run_calculation(incremental=False, chunk_size=None):
+    """
+    Calculate the portfolio from INPUT_FILE and publish it as the latest snapshot.
+
+    Args:
+        incremental (bool): Only recompute new, changed or expired rows.
+        chunk_size (int, optional): Stream the input in chunks of this many rows.
+
+    Returns:
+        dict: The run report, or None if the portfolio is empty.
+    """
+    with calculation_lock():
+        if chunk_size:
+            report = calculate_portfolio_streaming(INPUT_FILE, TEMP_FILE, chunk_size=chunk_size)
+        else:
+            report = calculate_portfolio(INPUT_FILE, TEMP_FILE, incremental=incremental)
+        if report is not None:
+            publish_snapshot(TEMP_FILE)
+    return report
+
+def parse_calculate_args():
+    """
+    Parse command-line arguments for the portfolio calculation.
+
+    Unknown arguments (such as the dashboard options passed by the main
+    menu) are ignored.
+
+    Returns:
+        argparse.Namespace: Parsed arguments with `incremental` and `chunk_size`.
+    """
+    parser = argparse.ArgumentParser(description="Calculate Portfolio")
+    parser.add_argument("--incremental", action="store_true", help="Only recompute new, changed or expired rows")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Stream the input in chunks of this many rows")
+    return parser.parse_known_args()[0]
 
 if __name__ == "__main__":
-    calculate_portfolio(INPUT_FILE, TEMP_FILE)
\ No newline at end of file
+    args = parse_calculate_args()
+    run_calculation(incremental=args.incremental, chunk_size=args.chunk_size)
\ No newline at end of file
@@ -0,0 +1,94 @@
+import os
+
+# Constants
+LONG_TERM_HOLD_YEARS = 2
+CHUNK_SIZE = 100_000  # Rows per chunk when streaming large portfolios
+
+# API Limits
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+API_CALLS_PER_MINUTE = 5  # Alpha Vantage free tier quota
+MAX_CONCURRENT_REQUESTS = 4
+REQUEST_TIMEOUT_SECONDS = 10
+MAX_RETRIES = 3
+THROTTLE_WAIT_SECONDS = 60
+BULK_QUOTE_BATCH_SIZE = 100
+USE_BULK_QUOTES = True
+
+# Price Provider ("alphavantage" or "fixture" for offline runs)
+PRICE_PROVIDER = os.environ.get("PRICE_PROVIDER", "alphavantage")
+
+# Quote Cache (time-to-live in seconds per asset type)
+QUOTE_TTL_SECONDS = {
+    "stock": 15 * 60,
+    "etf": 15 * 60,
+    "crypto": 60,
+    "default": 15 * 60
+}
+MARKET_CLOSED_TTL_SECONDS = 12 * 60 * 60
+
+# History Backfill
+COMPACT_HISTORY_DAYS = 100  # Trading days returned by outputsize=compact
+HISTORY_START_YEARS = 5  # Depth for assets without a purchase date
+
+# Risk Simulation
+RISK_PATHS = 1_000_000
+RISK_BATCH_SIZE = 100_000  # Paths per worker task
+RISK_HORIZONS_DAYS = [1, 10]
+RISK_CONFIDENCE_LEVELS = [0.95, 0.99]
+RISK_LOOKBACK_DAYS = 252  # Trading days of history behind the covariance matrix
+RISK_SEED = 20240101
+
+# Background Refresh
+REFRESH_INTERVAL_SECONDS = 15 * 60  # While the stock market is open
+REFRESH_CLOSED_INTERVAL_SECONDS = 60 * 60  # Crypto still trades when it is closed
+SNAPSHOT_KEEP = 48  # Versions kept on disk besides the latest
+
+# File Paths
+INPUT_FILE = "input/portfolio.csv"
+TEMP_FILE = "input/temp_portfolio.parquet"
+DATA_FILE = "input/income_expenses.csv"
+QUOTE_CACHE_FILE = "input/quote_cache.db"
+HISTORY_DIR = "input/history"
+METRICS_FILE = "input/metrics.json"
+SNAPSHOT_DIR = "input/snapshots"
+RUN_DIR = "input/run"  # PID files of the processes started by the menu
+PRICE_FIXTURE_FILE = os.environ.get("PRICE_FIXTURE_FILE", "input/price_fixture.csv")
+API_KEY_FILE = "input/api_key.md"
+
+# Ports
+PORT_MAIN = 8050
+PORT_PORTFOLIO = 8051
+PORT_BUDGET = 8052
+PORT_API = 8053
+
+# Child Processes
+READY_TIMEOUT_SECONDS = 10  # Wait for a child's port to accept connections
+STOP_TIMEOUT_SECONDS = 5  # Wait for a child to exit before killing it
+WORKER_POOL_SIZE = 2
+PROGRESS_WRITE_SECONDS = 0.25  # Minimum gap between updates of a calculation's progress file
+METRICS_FLUSH_SECONDS = 10  # How often long-running processes merge their metrics into METRICS_FILE
+WORKER_PRELOAD = ["pandas", "calculate_portfolio"]  # Imported once by the fork server; the jobs need no UI libraries
+
+# Keys read from API_KEY_FILE on first access
+API_KEY_NAMES = ["ALPHA_VANTAGE_API_KEY"]
+
+def __getattr__(name):
+    """
+    Load API keys lazily, so importing the configuration reads no files.
+
+    Args:
+        name (str): The attribute being looked up.
+
+    Returns:
+        str: The key's value, or None if the key file does not define it.
+
+    Raises:
+        AttributeError: If `name` is not a known setting.
+    """
+    if name in API_KEY_NAMES:
+        from dotenv import dotenv_values
+
+        keys = dotenv_values(API_KEY_FILE)
+        globals().update({key: keys.get(key) for key in API_KEY_NAMES})
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
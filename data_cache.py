@@ -0,0 +1,39 @@
+import os
+import threading
+
+class DataCache:
+    """
+    File-derived data shared by every page of the dashboard.
+
+    Each loader keeps the result for the last file and arguments it was
+    called with and runs again only when they differ or the file changed on
+    disk, so opening a page after the first time costs no parsing and no
+    figure building.
+    """
+
+    def __init__(self):
+        # Reentrant: a cached page layout loads its cached data while building
+        self.lock = threading.RLock()
+        self.entries = {}
+
+    def get(self, path, loader, *args):
+        """
+        Return the loader's result for a file, loading it if needed.
+
+        Args:
+            path (str): The file to load.
+            loader (function): Called with `path` and `args` to build the cached value.
+            *args: Further loader arguments; a change in them also reloads.
+
+        Returns:
+            The value returned by `loader(path, *args)`.
+        """
+        stamp = (path, os.stat(path).st_mtime_ns, args)
+        with self.lock:
+            entry = self.entries.get(loader.__qualname__)
+            if entry is None or entry[0] != stamp:
+                entry = (stamp, loader(path, *args))
+                self.entries[loader.__qualname__] = entry
+            return entry[1]
+
+data_cache = DataCache()
@@ -1,51 +1,63 @@
-import os
-import psutil
-from dash import Dash, html, dcc, Input, Output, State, callback_context
-import webbrowser
+import atexit
+from dash import Dash, html, dcc, Input, Output, State, callback_context, no_update
 from threading import Timer
+from metrics import timed_callback
+from portfolio_io import get_progress_file
+from run_report import format_progress, format_report, load_report
+from snapshots import get_latest_portfolio_file
+from supervisor import Supervisor
+from worker_pool import WorkerPool
+from config import (
+    DATA_FILE,
+    PORT_API,
+    PORT_MAIN,
+    TEMP_FILE
+)
 from utils import (
     DEFAULT_COLORS,
     DEFAULT_STYLE,
-    PORT_API,
-    PORT_BUDGET,
-    PORT_MAIN,
-    PORT_PORTFOLIO,
     SHOW_DOLLAR,
     THEMES,
     current_theme,
     main_background,
+    open_browser,
     parse_args,
     get_colors,
     set_current_theme,
     generate_main_content
 )
+from visualize_budget import build_budget_layout
+from visualize_portfolio import build_portfolio_layout, register_portfolio_callbacks
 
+# Jobs run on the warm worker pool by the menu buttons
 FUNCTIONS = {
-    "calculate_portfolio": ("calculate_portfolio.py", PORT_API),
-    "visualize_portfolio": ("visualize_portfolio.py", PORT_PORTFOLIO),
-    "visualize_budget": ("visualize_budget.py", PORT_BUDGET)
+    "calculate_portfolio": "calculate"
 }
 
-def kill_port(port):
-    for proc in psutil.process_iter(['pid', 'name']):
-        try:
-            for conn in proc.connections(kind='inet'):
-                if conn.laddr.port == port:
-                    proc.kill()
-        except (psutil.AccessDenied, psutil.NoSuchProcess):
-            continue
-
-def open_browser(port):
-    webbrowser.open_new(f"http://127.0.0.1:{port}")
-
-def run_function(script_name, port, show_dollar, theme):
-    kill_port(port)
-    os.system(f"python3 {script_name} --show-dollar {str(show_dollar).lower()} --theme {theme} &")
+# Dashboards served by the menu's own app, by button and by route
+PAGES = {
+    "visualize_portfolio": "/portfolio",
+    "visualize_budget": "/budget"
+}
 
 def main():
     global current_theme, SHOW_DOLLAR
 
-    kill_port(PORT_MAIN)
+    # Replace a menu left running from an earlier start, and stop our children when we exit
+    supervisor = Supervisor()
+    supervisor.claim("main")
+    atexit.register(supervisor.stop_all)
+
+    # Serve metrics and the portfolio API on PORT_API for as long as the menu is running
+    supervisor.start("api_server", "api_server.py", port=PORT_API)
+
+    # Keep prices and the latest snapshot fresh in the background
+    supervisor.start("refresher", "refresher.py")
+
+    # Fork workers with pandas and the calculation already imported, ready for the first click
+    pool = WorkerPool()
+    pool.warm_in_background()
+    atexit.register(pool.shutdown)
 
     app = Dash(__name__, suppress_callback_exceptions=True)
 
@@ -84,43 +96,134 @@ def main():
         [Output("feature_flag_label", "children"), Output("feature_flag_button", "children")],
         Input("feature_flag_button", "n_clicks"),
     )
+    @timed_callback("main")
     def toggle_feature_flag(n_clicks):
         global SHOW_DOLLAR
-        SHOW_DOLLAR = n_clicks % 2 == 0
+        # The menu is rendered again after every visit to a dashboard; only a click flips the flag
+        if callback_context.triggered:
+            SHOW_DOLLAR = not SHOW_DOLLAR
         return ("Balance Visible" if SHOW_DOLLAR else "Balance Hidden",
                 "Hide" if SHOW_DOLLAR else "Show")
 
+    def render_page(pathname):
+        if pathname == PAGES["visualize_portfolio"]:
+            build_page = lambda: build_portfolio_layout(get_latest_portfolio_file(TEMP_FILE), SHOW_DOLLAR)
+        elif pathname == PAGES["visualize_budget"]:
+            build_page = lambda: build_budget_layout(DATA_FILE, SHOW_DOLLAR)
+        else:
+            return get_layout()
+
+        try:
+            page = build_page()
+        except (OSError, ValueError) as error:
+            page = html.Div(f"Unable to show this dashboard: {error}", style={"textAlign": "center", "padding": "20px"})
+        return html.Div(
+            style={"backgroundColor": main_background},
+            children=[
+                dcc.Link("Back to Menu", href="/", style={"color": DEFAULT_COLORS["white"], "margin": "10px", "display": "inline-block"}),
+                page,
+            ],
+        )
+
+    @app.callback(
+        Output("page_content", "children"),
+        Input("url", "pathname"),
+    )
+    @timed_callback("main")
+    def display_page(pathname):
+        return render_page(pathname)
+
+    register_portfolio_callbacks(app)
+
     @app.callback(
-        Output("output", "children"),
+        [Output("output", "children"),
+         Output("report_interval", "disabled"),
+         Output("url", "pathname")],
         [Input("calculate_portfolio", "n_clicks"),
          Input("visualize_portfolio", "n_clicks"),
          Input("visualize_budget", "n_clicks")],
         State("theme_dropdown", "value"),
     )
+    @timed_callback("main")
     def handle_button_click(calc_clicks, vis_port_clicks, vis_budget_clicks, selected_theme):
         triggered = callback_context.triggered
         if not triggered:
-            return "No action taken yet."
+            return "No action taken yet.", no_update, no_update
 
         button_id = triggered[0]["prop_id"].split(".")[0]
+        if button_id in PAGES:
+            # Dashboards are pages of this app, so opening one needs no new process
+            return no_update, no_update, PAGES[button_id]
         if button_id in FUNCTIONS:
             current_theme = selected_theme
             balance_visibility = "visible" if SHOW_DOLLAR else "hidden"
-            script_name, port = FUNCTIONS[button_id]
-            run_function(script_name, port, SHOW_DOLLAR, current_theme)
-            return html.Div([
-                html.Div(f"Running: {button_id.replace('_', ' ').title()}", style={"fontWeight": "bold"}),
+            # Clicks while the job runs join it rather than starting another run
+            job, started = pool.submit(FUNCTIONS[button_id])
+            action = button_id.replace('_', ' ').title()
+            status = html.Div([
+                html.Div(
+                    f"Running: {action}" if started else f"Already running: {action} ({job.requests} requests)",
+                    style={"fontWeight": "bold"}
+                ),
                 html.Div(f"Theme: {current_theme.title()}"),
                 html.Div(f"Balance: {balance_visibility.title()}")
             ])
+            # Poll the job for progress until it finishes
+            return status, False, no_update
+
+        return "Invalid action.", no_update, no_update
+
+    @app.callback(
+        [Output("run_report", "children"),
+         Output("report_interval", "disabled", allow_duplicate=True)],
+        Input("report_interval", "n_intervals"),
+        prevent_initial_call=True,
+    )
+    @timed_callback("main")
+    def show_run_report(n_intervals):
+        job = pool.get_job(FUNCTIONS["calculate_portfolio"])
+        if job is None:
+            return no_update, True
+
+        if not job.done():
+            progress = load_report(get_progress_file(TEMP_FILE))
+            if progress is None or progress["started_at"] < job.started_at:
+                # The job waits for the calculation lock while a refresh is writing the output
+                line = "Waiting for the running refresh to finish" if progress and progress["stage"] != "done" else "Starting"
+                bar = []
+            else:
+                line = format_progress(progress)
+                bar = [html.Progress(value=progress["done"], max=progress["total"])] if progress["total"] else []
+            return html.Div([
+                html.Div(f"Calculating... {job.elapsed():.0f}s", style={"fontWeight": "bold"}),
+                html.Div(line),
+                *bar
+            ]), False
 
-        return "Invalid action."
+        if job.future.cancelled():
+            return f"Calculation cancelled after {job.elapsed():.1f}s", True
+        if job.future.exception() is not None:
+            return html.Div([
+                html.Div(f"Calculation failed after {job.elapsed():.1f}s", style={"fontWeight": "bold"}),
+                html.Div(str(job.future.exception()))
+            ]), True
+        report = job.future.result()
+        if report is None:
+            return f"Nothing to calculate: the portfolio is empty ({job.elapsed():.1f}s)", True
+        return html.Div([
+            html.Div(f"Last Calculation: done in {job.elapsed():.1f}s", style={"fontWeight": "bold"}),
+            *[html.Div(line) for line in format_report(report, show_dollar=SHOW_DOLLAR)]
+        ]), True
     
-    app.layout = get_layout()
+    app.layout = html.Div([
+        dcc.Location(id="url", refresh=False),
+        html.Div(id="page_content", children=get_layout()),
+    ])
     @app.callback(
         Output("theme_dropdown", "value"),
         Input("theme_dropdown", "value"),
     )
+    @timed_callback("main")
     def update_theme(selected_theme):
         global current_theme
         if callback_context.triggered and "theme_dropdown" in callback_context.triggered[0]["prop_id"]:
@@ -132,6 +235,7 @@ def main():
         Output("main_content", "children"),
         Input("theme_dropdown", "value"),
     )
+    @timed_callback("main")
     def update_main_content(selected_theme):
         global current_theme
         if callback_context.triggered and "theme_dropdown" in callback_context.triggered[0]["prop_id"]:
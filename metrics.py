@@ -0,0 +1,240 @@
+import atexit
+import fcntl
+import functools
+import json
+import math
+import os
+import threading
+import time
+from portfolio_io import atomic_path
+from config import METRICS_FILE, METRICS_FLUSH_SECONDS
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+# Every exported metric: name -> (type, help text)
+METRICS = {
+    "portfolio_quote_fetch_seconds": ("histogram", "Latency of price API requests by function."),
+    "portfolio_quote_cache_requests_total": ("counter", "Quote cache lookups by result (hit, miss, stale)."),
+    "portfolio_quote_cache_hit_ratio": ("gauge", "Share of quote cache lookups that were hits."),
+    "portfolio_rate_limit_wait_seconds_total": ("counter", "Time spent waiting for the API rate limiter."),
+    "portfolio_rate_limit_throttled_total": ("counter", "Throttle responses received from the price API."),
+    "portfolio_last_valuation_timestamp_seconds": ("gauge", "Unix time of the last successful valuation."),
+    "portfolio_value_dollars": ("gauge", "Portfolio value from the last valuation, by type and in total."),
+    "portfolio_calculation_stage_seconds": ("gauge", "Duration of each stage of the last calculation."),
+    "portfolio_callback_seconds": ("histogram", "Dash callback render latency by app and callback."),
+}
+
+def format_labels(labels):
+    """
+    Format labels the way the Prometheus text format writes them.
+
+    Args:
+        labels (dict): Label names and values.
+
+    Returns:
+        str: `{name="value",...}`, or an empty string without labels.
+    """
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in sorted(labels.items())
+    )
+    return "{" + pairs + "}"
+
+class MetricsRegistry:
+    """
+    Process-local metrics that are merged into one shared file on flush.
+
+    The dashboards, the calculation script and the API server are separate
+    processes, so each one records changes in memory and `flush` folds them
+    into METRICS_FILE under an exclusive file lock: counters and histograms
+    are added, gauges are overwritten. Counters therefore keep growing across
+    runs of the one-shot scripts, as Prometheus expects. Long-running
+    processes flush from a background thread instead, so recording a sample
+    never waits on the file.
+    """
+
+    def __init__(self, path=METRICS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.flusher = None
+
+    def _series(self, name, labels, default):
+        key = name + format_labels(labels)
+        return self.pending.setdefault(key, default)
+
+    def inc(self, name, amount=1.0, **labels):
+        """
+        Add to a counter.
+
+        Args:
+            name (str): A counter in METRICS.
+            amount (float): Amount to add.
+            **labels: Label values of the series.
+        """
+        with self.lock:
+            series = self._series(name, labels, {"value": 0.0})
+            series["value"] += amount
+
+    def set(self, name, value, **labels):
+        """
+        Set a gauge.
+
+        Args:
+            name (str): A gauge in METRICS.
+            value (float): The new value.
+            **labels: Label values of the series.
+        """
+        with self.lock:
+            self._series(name, labels, {})["value"] = float(value)
+
+    def observe(self, name, value, **labels):
+        """
+        Record one observation in a histogram.
+
+        Args:
+            name (str): A histogram in METRICS.
+            value (float): The observed value, in seconds for latencies.
+            **labels: Label values of the series.
+        """
+        with self.lock:
+            series = self._series(name, labels, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0})
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def flush(self):
+        """Merge the pending changes into the shared metrics file."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            stored = load_metrics(self.path)
+            for key, series in pending.items():
+                name = key.split("{")[0]
+                current = stored.get(key)
+                if current is None or METRICS[name][0] == "gauge":
+                    stored[key] = series
+                elif "buckets" in series:
+                    current["buckets"] = [a + b for a, b in zip(current["buckets"], series["buckets"])]
+                    current["sum"] += series["sum"]
+                    current["count"] += series["count"]
+                else:
+                    current["value"] += series["value"]
+            with atomic_path(self.path) as temp_path:
+                with open(temp_path, "w") as metrics_file:
+                    json.dump(stored, metrics_file)
+
+    def start_flusher(self, interval=METRICS_FLUSH_SECONDS):
+        """
+        Flush every `interval` seconds from a daemon thread; later calls do nothing.
+
+        Args:
+            interval (float): Seconds between flushes.
+        """
+        with self.lock:
+            if self.flusher is not None:
+                return
+            self.flusher = threading.Thread(target=self._flush_periodically, args=(interval,), daemon=True)
+        self.flusher.start()
+
+    def _flush_periodically(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except (OSError, ValueError) as error:
+                print(f"Unable to write metrics: {error}")
+
+def load_metrics(path=METRICS_FILE):
+    """
+    Read the shared metrics file.
+
+    Args:
+        path (str): Path of the metrics file.
+
+    Returns:
+        dict: Series keyed by name and labels; empty if nothing was recorded yet.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as metrics_file:
+        return json.load(metrics_file)
+
+def render_metrics(path=METRICS_FILE):
+    """
+    Export the shared metrics in the Prometheus text exposition format.
+
+    Args:
+        path (str): Path of the metrics file.
+
+    Returns:
+        str: The exposition text.
+    """
+    stored = load_metrics(path)
+
+    # The hit ratio is derived from the lookup counters at scrape time
+    lookups = {key: series["value"] for key, series in stored.items() if key.startswith("portfolio_quote_cache_requests_total")}
+    total = sum(lookups.values())
+    if total:
+        hits = sum(value for key, value in lookups.items() if 'result="hit"' in key)
+        stored["portfolio_quote_cache_hit_ratio"] = {"value": hits / total}
+
+    lines = []
+    for name, (metric_type, help_text) in METRICS.items():
+        series = {key: value for key, value in stored.items() if key.split("{")[0] == name}
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for key, value in sorted(series.items()):
+            labels = key[len(name):]
+            if metric_type != "histogram":
+                lines.append(f"{key} {float(value['value'])!r}")
+                continue
+            # Bucket counts are stored cumulatively already
+            prefix = labels[1:-1] + "," if labels else ""
+            for bound, count in zip(LATENCY_BUCKETS + [math.inf], value["buckets"] + [value["count"]]):
+                le = "+Inf" if bound == math.inf else f"{bound:g}"
+                lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {count}')
+            lines.append(f"{name}_sum{labels} {float(value['sum'])!r}")
+            lines.append(f"{name}_count{labels} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
+
+def timed_callback(app_name):
+    """
+    Decorate a Dash callback so its render latency is recorded.
+
+    Samples are kept in memory and written by the registry's background
+    flusher, so a callback does no file I/O for its metrics.
+
+    Args:
+        app_name (str): Name of the Dash app the callback belongs to.
+
+    Returns:
+        function: The decorator.
+    """
+    def decorator(callback):
+        @functools.wraps(callback)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                registry.observe("portfolio_callback_seconds", time.perf_counter() - started,
+                                 app=app_name, callback=callback.__name__)
+                registry.start_flusher()
+        return wrapper
+    return decorator
@@ -0,0 +1,233 @@
+import os
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+# Explicit column types for the computed portfolio; other columns keep their inferred type
+PORTFOLIO_SCHEMA = {
+    "Ticker": "string",
+    "Type": "string",
+    "Quantity": "float64",
+    "Cost Basis": "float64",
+    "Purchase Date": "string",
+    "Liquidity": "string",
+    "Current Price": "float64",
+    "Value": "float64",
+    "Gain/Loss": "float64",
+    "% Gain/Loss": "float64",
+    "Long-Term Hold": "string",
+    "Days Held": "Int64",
+    "Days Until Long-Term": "Int64",
+    "Long-Term Date": "string",
+    "% XIRR": "float64",
+    "% TWR": "float64",
+}
+
+PARQUET_MAGIC = b"PAR1"
+ARROW_MAGIC = b"ARROW1"
+
+@contextmanager
+def atomic_path(path):
+    """
+    Yield a temporary path that replaces `path` only once writing succeeds.
+
+    The temporary file lives in the same directory so the final rename is
+    atomic; readers see either the old file or the complete new one.
+
+    Args:
+        path (str): The destination file.
+
+    Yields:
+        str: The temporary path to write to.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    os.close(handle)
+    try:
+        yield temp_path
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def apply_schema(portfolio):
+    """
+    Cast the known portfolio columns to their schema types.
+
+    Args:
+        portfolio (pd.DataFrame): The computed portfolio.
+
+    Returns:
+        pd.DataFrame: A copy with PORTFOLIO_SCHEMA dtypes applied.
+    """
+    dtypes = {column: dtype for column, dtype in PORTFOLIO_SCHEMA.items() if column in portfolio}
+    return portfolio.astype(dtypes)
+
+def get_format(path):
+    """
+    Determine the output format from a file extension.
+
+    Args:
+        path (str): The output path.
+
+    Returns:
+        str: "parquet", "feather" or "csv".
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        return "parquet"
+    if extension in [".feather", ".arrow"]:
+        return "feather"
+    return "csv"
+
+def get_returns_file(output_file):
+    """
+    Return the path of the returns summary stored next to an output file.
+
+    Args:
+        output_file (str): Path of the processed portfolio.
+
+    Returns:
+        str: Path of the `.returns` sidecar, in the same format as the output.
+    """
+    base, extension = os.path.splitext(output_file)
+    return base + ".returns" + extension
+
+def get_report_file(output_file):
+    """
+    Return the path of the run report stored next to an output file.
+
+    Args:
+        output_file (str): Path of the processed portfolio.
+
+    Returns:
+        str: Path of the `.report.json` sidecar.
+    """
+    return os.path.splitext(output_file)[0] + ".report.json"
+
+def get_progress_file(output_file):
+    """
+    Return the path of the progress file a running calculation keeps next to an output file.
+
+    Args:
+        output_file (str): Path of the processed portfolio.
+
+    Returns:
+        str: Path of the `.progress.json` sidecar.
+    """
+    return os.path.splitext(output_file)[0] + ".progress.json"
+
+def write_portfolio(portfolio, path):
+    """
+    Atomically write the computed portfolio in the format implied by `path`.
+
+    Args:
+        portfolio (pd.DataFrame): The computed portfolio.
+        path (str): Destination ending in .parquet, .feather/.arrow or .csv.
+    """
+    output_format = get_format(path)
+    portfolio = apply_schema(portfolio).reset_index(drop=True)
+    with atomic_path(path) as temp_path:
+        if output_format == "parquet":
+            portfolio.to_parquet(temp_path, index=False)
+        elif output_format == "feather":
+            portfolio.to_feather(temp_path)
+        else:
+            portfolio.to_csv(temp_path, index=False)
+
+def detect_format(path):
+    """
+    Detect a portfolio file's format from its leading bytes.
+
+    Args:
+        path (str): The file to inspect.
+
+    Returns:
+        str: "parquet", "feather" or "csv".
+    """
+    with open(path, "rb") as portfolio_file:
+        header = portfolio_file.read(len(ARROW_MAGIC))
+    if header.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if header.startswith(ARROW_MAGIC):
+        return "feather"
+    return "csv"
+
+def read_portfolio(path):
+    """
+    Load a computed portfolio, whatever format it was written in.
+
+    Args:
+        path (str): Path to a Parquet, Feather/Arrow IPC or CSV file.
+
+    Returns:
+        pd.DataFrame: The portfolio with schema dtypes applied.
+    """
+    # pandas is imported here so that modules needing only atomic_path stay light
+    import pandas as pd
+
+    input_format = detect_format(path)
+    if input_format == "parquet":
+        return pd.read_parquet(path)
+    if input_format == "feather":
+        return pd.read_feather(path)
+    return apply_schema(pd.read_csv(path))
+
+class PortfolioWriter:
+    """
+    Stream chunks of the computed portfolio into a single output file.
+
+    Chunks are appended to a temporary file that replaces the destination
+    only when the writer closes without an error. Every chunk is cast to
+    PORTFOLIO_SCHEMA (and, for Arrow formats, to the first chunk's schema)
+    so the file has one consistent set of column types.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.output_format = get_format(path)
+        self.writer = None
+        self.schema = None
+        self.header = True
+        self._stack = ExitStack()
+        self.temp_path = None
+
+    def __enter__(self):
+        self.temp_path = self._stack.enter_context(atomic_path(self.path))
+        return self
+
+    def write(self, chunk):
+        """
+        Append one chunk of rows.
+
+        Args:
+            chunk (pd.DataFrame): A valued portfolio chunk.
+        """
+        chunk = apply_schema(chunk).reset_index(drop=True)
+        if self.output_format == "csv":
+            chunk.to_csv(self.temp_path, mode="a", header=self.header, index=False)
+            self.header = False
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self.writer is None:
+            self.schema = table.schema
+            if self.output_format == "parquet":
+                self.writer = pq.ParquetWriter(self.temp_path, self.schema)
+            else:
+                self.writer = pa.ipc.new_file(self.temp_path, self.schema)
+        self.writer.write_table(table.cast(self.schema))
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None and self.writer is None and self.output_format != "csv":
+            # No chunks were written; still leave a valid, empty file behind
+            import pandas as pd
+
+            self.write(pd.DataFrame(columns=list(PORTFOLIO_SCHEMA)))
+        if self.writer is not None:
+            self.writer.close()
+        return self._stack.__exit__(exc_type, exc, traceback)
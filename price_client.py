@@ -0,0 +1,289 @@
+import random
+import threading
+import time
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import registry
+import config
+from config import (
+    ALPHA_VANTAGE_URL,
+    API_CALLS_PER_MINUTE,
+    BULK_QUOTE_BATCH_SIZE,
+    MAX_CONCURRENT_REQUESTS,
+    MAX_RETRIES,
+    REQUEST_TIMEOUT_SECONDS,
+    THROTTLE_WAIT_SECONDS
+)
+
+# Wording of the "Note"/"Information" payloads. Throttle messages also link
+# to the premium plans, so only the premium-endpoint wording marks a tier error.
+RATE_LIMIT_MARKERS = ["rate limit", "call frequency", "requests per day", "requests per minute"]
+DAILY_LIMIT_MARKERS = ["requests per day", "daily rate limit"]
+PREMIUM_ENDPOINT_MARKERS = ["premium endpoint"]
+
+def is_daily_limit_message(message):
+    """
+    Check whether an API message says the daily quota is used up.
+
+    Args:
+        message (str): The "Note" or "Information" text of a response.
+
+    Returns:
+        bool: True if no request will succeed again until the quota resets.
+    """
+    message = message.lower()
+    return any(marker in message for marker in DAILY_LIMIT_MARKERS)
+
+def is_premium_message(message):
+    """
+    Check whether an API message says the function needs a higher tier.
+
+    Args:
+        message (str): The "Note" or "Information" text of a response.
+
+    Returns:
+        bool: True for a premium-endpoint refusal, False for rate limits and
+              anything else that is worth retrying.
+    """
+    message = message.lower()
+    if any(marker in message for marker in RATE_LIMIT_MARKERS):
+        return False
+    return any(marker in message for marker in PREMIUM_ENDPOINT_MARKERS)
+
+class PriceFetchError(Exception):
+    """Raised when a quote cannot be fetched after all retries."""
+
+class PremiumEndpointError(PriceFetchError):
+    """Raised when the API key's tier does not include the requested function."""
+
+class DailyLimitError(PriceFetchError):
+    """Raised when the API key's daily request quota is used up."""
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+
+    The bucket starts full so a short burst can go out immediately, then
+    refills continuously at `rate_per_minute` tokens per minute.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then consume it.
+
+        Returns:
+            float: Seconds spent waiting for the token.
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class AlphaVantageClient:
+    """
+    Alpha Vantage API client sharing one pooled keep-alive session.
+
+    Every request goes through the token bucket, is retried with exponential
+    backoff plus jitter on connection errors and 5xx responses, and waits out
+    the "Note"/"Information" throttle payloads instead of treating them as data.
+    An exhausted daily quota fails at once, since waiting would not clear it.
+    """
+
+    def __init__(self, api_key=None, base_url=ALPHA_VANTAGE_URL,
+                 rate_limiter=None, pool_size=MAX_CONCURRENT_REQUESTS,
+                 timeout=REQUEST_TIMEOUT_SECONDS, max_retries=MAX_RETRIES,
+                 throttle_wait=THROTTLE_WAIT_SECONDS):
+        # The key file is only read once a client is actually needed
+        self.api_key = api_key if api_key is not None else config.ALPHA_VANTAGE_API_KEY
+        self.base_url = base_url
+        self.rate_limiter = rate_limiter or TokenBucket(API_CALLS_PER_MINUTE)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.throttle_wait = throttle_wait
+        self.bulk_supported = True
+        self.request_count = 0
+        self.count_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt):
+        """Sleep for an exponentially growing, jittered delay, unless no attempt is left."""
+        if attempt < self.max_retries:
+            time.sleep(min(2 ** attempt, 30) + random.uniform(0, 1))
+
+    def query(self, **params):
+        """
+        Call the API and return the decoded JSON payload.
+
+        Args:
+            **params: Query parameters (e.g., function, symbol).
+
+        Returns:
+            dict: The decoded response body.
+
+        Raises:
+            PriceFetchError: If the request still fails after all retries.
+        """
+        params = {**params, "apikey": self.api_key}
+        error = None
+
+        for attempt in range(self.max_retries + 1):
+            waited = self.rate_limiter.acquire()
+            if waited:
+                registry.inc("portfolio_rate_limit_wait_seconds_total", waited)
+            with self.count_lock:
+                self.request_count += 1
+            started = time.perf_counter()
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                error = exc
+                self._backoff(attempt)
+                continue
+            finally:
+                registry.observe("portfolio_quote_fetch_seconds", time.perf_counter() - started, function=params.get("function"))
+
+            if response.status_code >= 500:
+                error = f"HTTP {response.status_code}"
+                self._backoff(attempt)
+                continue
+            if response.status_code >= 400:
+                raise PriceFetchError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+            try:
+                data = response.json()
+            except ValueError:
+                raise PriceFetchError(f"Invalid JSON response: {response.text[:200]}")
+
+            throttle_message = data.get("Note") or data.get("Information")
+            if throttle_message and is_premium_message(throttle_message):
+                raise PremiumEndpointError(throttle_message)
+            if throttle_message:
+                registry.inc("portfolio_rate_limit_throttled_total")
+                # Waiting a minute cannot help once the day's quota is gone
+                if is_daily_limit_message(throttle_message):
+                    raise DailyLimitError(throttle_message)
+                error = throttle_message
+                if attempt < self.max_retries:
+                    print(f"Rate limited by Alpha Vantage, waiting {self.throttle_wait}s: {throttle_message}")
+                    time.sleep(self.throttle_wait)
+                continue
+
+            return data
+
+        raise PriceFetchError(f"Giving up after {self.max_retries + 1} attempts: {error}")
+
+    def quote(self, ticker, asset_type):
+        """
+        Fetch the current price for a stock, ETF or crypto.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): One of stock, etf or crypto.
+
+        Returns:
+            tuple: (price, source) where source is the API function used.
+
+        Raises:
+            PriceFetchError: If the quote cannot be fetched or parsed.
+        """
+        if asset_type in ["stock", "etf"]:
+            function = "GLOBAL_QUOTE"
+            data = self.query(function=function, symbol=ticker)
+            keys = ("Global Quote", "05. price")
+        elif asset_type == "crypto":
+            function = "CURRENCY_EXCHANGE_RATE"
+            data = self.query(function=function, from_currency=ticker.upper(), to_currency="USD")
+            keys = ("Realtime Currency Exchange Rate", "5. Exchange Rate")
+        else:
+            raise PriceFetchError(f"Unsupported asset type: {asset_type}")
+
+        try:
+            return float(data[keys[0]][keys[1]]), function
+        except (KeyError, TypeError, ValueError):
+            raise PriceFetchError(f"Unexpected response: {data}")
+
+    def bulk_quotes(self, symbols):
+        """
+        Fetch current stock/ETF prices for many symbols in one call.
+
+        Args:
+            symbols (list): Up to BULK_QUOTE_BATCH_SIZE ticker symbols.
+
+        Returns:
+            dict: Mapping of upper-cased symbol to price. Symbols the API
+                  did not return are omitted.
+
+        Raises:
+            PremiumEndpointError: If the key's tier lacks bulk quote access.
+            PriceFetchError: If the request fails or the payload is malformed.
+        """
+        if len(symbols) > BULK_QUOTE_BATCH_SIZE:
+            raise ValueError(f"At most {BULK_QUOTE_BATCH_SIZE} symbols per bulk request")
+
+        data = self.query(function="REALTIME_BULK_QUOTES", symbol=",".join(symbols))
+        if "data" not in data:
+            raise PriceFetchError(f"Unexpected response: {data}")
+
+        prices = {}
+        for item in data["data"]:
+            try:
+                prices[item["symbol"].upper()] = float(item["close"])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return prices
+
+    def daily_series(self, ticker, asset_type, outputsize="compact"):
+        """
+        Fetch daily closing prices for a stock, ETF or crypto.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): One of stock, etf or crypto.
+            outputsize (str): "compact" for the latest 100 days or "full".
+
+        Returns:
+            pd.Series: Closing prices indexed by date, oldest first.
+
+        Raises:
+            PriceFetchError: If the series cannot be fetched or parsed.
+        """
+        if asset_type in ["stock", "etf"]:
+            data = self.query(function="TIME_SERIES_DAILY", symbol=ticker, outputsize=outputsize)
+            series_key, close_keys = "Time Series (Daily)", ["4. close"]
+        elif asset_type == "crypto":
+            data = self.query(function="DIGITAL_CURRENCY_DAILY", symbol=ticker.upper(), market="USD")
+            series_key, close_keys = "Time Series (Digital Currency Daily)", ["4. close", "4a. close (USD)"]
+        else:
+            raise PriceFetchError(f"Unsupported asset type: {asset_type}")
+
+        try:
+            closes = {
+                day: float(next(bar[key] for key in close_keys if key in bar))
+                for day, bar in data[series_key].items()
+            }
+        except (KeyError, StopIteration, TypeError, ValueError):
+            raise PriceFetchError(f"Unexpected response: {str(data)[:200]}")
+
+        series = pd.Series(closes, dtype="float64")
+        series.index = pd.to_datetime(series.index)
+        return series.sort_index()
@@ -0,0 +1,212 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from portfolio_io import atomic_path
+from config import HISTORY_DIR
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+def to_day_numbers(dates):
+    """
+    Convert dates to whole days since the Unix epoch.
+
+    Args:
+        dates (array-like): Dates or timestamps.
+
+    Returns:
+        np.ndarray: float64 day numbers (NaN for missing dates).
+    """
+    days = pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy(dtype="datetime64[D]")
+    numbers = (days - EPOCH).astype("float64")
+    numbers[np.isnat(days)] = np.nan
+    return numbers
+
+class PriceHistoryStore:
+    """
+    Local store of daily closing prices, one memory-mapped file per asset.
+
+    Each file holds a (2, N) float64 array: row 0 is the sorted day numbers
+    and row 1 the matching closes, so both columns are contiguous and a date
+    range can be sliced out of the memory map without reading the rest.
+    """
+
+    def __init__(self, directory=HISTORY_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, ticker, asset_type):
+        """
+        Return the file backing one asset's history.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): The type of asset.
+
+        Returns:
+            str: Path of the `.npy` file.
+        """
+        return os.path.join(self.directory, f"{str(ticker).upper()}.{asset_type}.npy")
+
+    def get_coverage(self, ticker, asset_type):
+        """
+        Return the date range already backfilled for an asset.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): The type of asset.
+
+        Returns:
+            tuple: (start, end) as pd.Timestamp, or None if never backfilled.
+        """
+        coverage = self._read_coverage().get(f"{str(ticker).upper()}.{asset_type}")
+        if coverage is None:
+            return None
+        return pd.Timestamp(coverage["start"]), pd.Timestamp(coverage["end"])
+
+    def set_coverage(self, ticker, asset_type, start, end):
+        """
+        Record the date range backfilled for an asset.
+
+        Days inside the range that have no close (holidays, days before a
+        listing) are known to be absent and are not requested again.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): The type of asset.
+            start (pd.Timestamp): First covered day.
+            end (pd.Timestamp): Last covered day.
+        """
+        coverage = self._read_coverage()
+        coverage[f"{str(ticker).upper()}.{asset_type}"] = {
+            "start": pd.Timestamp(start).strftime("%Y-%m-%d"),
+            "end": pd.Timestamp(end).strftime("%Y-%m-%d"),
+        }
+        with atomic_path(os.path.join(self.directory, "coverage.json")) as temp_path:
+            with open(temp_path, "w") as coverage_file:
+                json.dump(coverage, coverage_file, indent=2, sort_keys=True)
+
+    def _read_coverage(self):
+        """Load the coverage index, empty if it does not exist yet."""
+        path = os.path.join(self.directory, "coverage.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as coverage_file:
+            return json.load(coverage_file)
+
+    def load(self, ticker, asset_type):
+        """
+        Memory-map one asset's history.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): The type of asset.
+
+        Returns:
+            tuple: (day numbers, closes) as read-only arrays; empty if the
+                   asset has no stored history.
+        """
+        path = self.get_path(ticker, asset_type)
+        if not os.path.exists(path):
+            return np.empty(0), np.empty(0)
+        history = np.load(path, mmap_mode="r")
+        return history[0], history[1]
+
+    def merge(self, ticker, asset_type, closes):
+        """
+        Add daily closes to an asset's history, replacing overlapping days.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): The type of asset.
+            closes (pd.Series): Closing prices indexed by date.
+
+        Returns:
+            int: Number of days stored for the asset after the merge.
+        """
+        days, values = self.load(ticker, asset_type)
+        merged = pd.concat([
+            pd.Series(np.asarray(values), index=np.asarray(days)),
+            pd.Series(closes.to_numpy(dtype="float64"), index=to_day_numbers(closes.index)),
+        ])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        merged = merged[merged.index.notna()]
+
+        history = np.vstack([merged.index.to_numpy(dtype="float64"), merged.to_numpy(dtype="float64")])
+        with atomic_path(self.get_path(ticker, asset_type)) as temp_path:
+            with open(temp_path, "wb") as history_file:
+                np.save(history_file, history)
+        return len(merged)
+
+    def closes_on(self, ticker, asset_type, day_numbers):
+        """
+        Look up the most recent close on or before each requested day.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): The type of asset.
+            day_numbers (np.ndarray): Sorted day numbers to price.
+
+        Returns:
+            np.ndarray: Closes aligned with `day_numbers` (NaN before the
+                        first stored day).
+        """
+        days, values = self.load(ticker, asset_type)
+        closes = np.full(len(day_numbers), np.nan)
+        if len(days) == 0 or len(day_numbers) == 0:
+            return closes
+
+        # Only the slice covering the requested range is paged in from disk
+        start = max(np.searchsorted(days, day_numbers[0], side="right") - 1, 0)
+        stop = np.searchsorted(days, day_numbers[-1], side="right")
+        window_days = np.asarray(days[start:stop])
+        window_values = np.asarray(values[start:stop])
+
+        positions = np.searchsorted(window_days, day_numbers, side="right") - 1
+        found = positions >= 0
+        closes[found] = window_values[positions[found]]
+        return closes
+
+def portfolio_value_history(portfolio, start, end, store=None):
+    """
+    Compute the portfolio's daily value over a date range.
+
+    Each lot counts from its purchase date onward (lots without a valid date
+    count for the whole range). Quantities are aggregated per asset with a
+    cumulative sum over purchase dates, then multiplied by the asset's
+    forward-filled closes and summed across assets.
+
+    Args:
+        portfolio (pd.DataFrame): Computed portfolio with lower-case `Type`.
+        start (str or datetime): First day of the range.
+        end (str or datetime): Last day of the range.
+        store (PriceHistoryStore, optional): Source of stored closes.
+
+    Returns:
+        pd.Series: Portfolio value indexed by date. Days where an asset has
+                   no stored close yet count that asset as zero.
+    """
+    store = store or PriceHistoryStore()
+    dates = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="D")
+    day_numbers = to_day_numbers(dates)
+    total = np.zeros(len(dates))
+
+    lots = portfolio[portfolio["Ticker"].notna() & portfolio["Quantity"].notna()]
+    purchase_days = to_day_numbers(lots["Purchase Date"]) if "Purchase Date" in lots else np.full(len(lots), np.nan)
+    lots = lots.assign(
+        _day=np.nan_to_num(purchase_days, nan=-np.inf),
+        _key=lots["Ticker"].astype(str).str.strip().str.upper()
+    )
+
+    for (ticker, asset_type), group in lots.groupby(["_key", "Type"], sort=False):
+        group = group.sort_values("_day")
+        held = np.concatenate([[0.0], np.cumsum(group["Quantity"].to_numpy(dtype="float64"))])
+        quantity = held[np.searchsorted(group["_day"].to_numpy(), day_numbers, side="right")]
+
+        if asset_type in ["stock", "etf", "crypto"]:
+            price = np.nan_to_num(store.closes_on(ticker, asset_type, day_numbers))
+        else:
+            price = 1.0
+        total += quantity * price
+
+    return pd.Series(total, index=dates, name="Value")
@@ -0,0 +1,322 @@
+import os
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from price_client import AlphaVantageClient, PremiumEndpointError, PriceFetchError
+from quote_cache import QuoteCache
+from config import (
+    BULK_QUOTE_BATCH_SIZE,
+    MAX_CONCURRENT_REQUESTS,
+    PRICE_FIXTURE_FILE,
+    PRICE_PROVIDER,
+    USE_BULK_QUOTES
+)
+
+FIXED_PRICE_TYPES = ["cash", "401k", "hsa", "espp"]
+MARKET_TYPES = ["stock", "etf", "crypto"]
+
+class PriceProvider:
+    """
+    Base class for price sources.
+
+    Subclasses implement `fetch` for market-priced (stock, etf, crypto)
+    requests; fixed-price and unsupported types are handled here so every
+    provider treats them the same way.
+    """
+
+    name = None
+
+    def get_prices(self, requests, progress=None):
+        """
+        Resolve a batch of quotes.
+
+        Args:
+            requests (list): Unique (ticker, asset_type) pairs. Tickers are
+                             expected to be normalized already.
+            progress (function, optional): Called as `progress(done, total, key)`
+                                           each time a price is resolved.
+
+        Returns:
+            dict: Mapping of (ticker, asset_type) to price. Fixed-price types
+                  are 1, unsupported types are None and failed lookups are 0.
+        """
+        resolved = []
+
+        def on_resolved(key):
+            resolved.append(key)
+            if progress is not None:
+                progress(len(resolved), len(requests), key)
+
+        prices = {}
+        market_requests = []
+        for key in requests:
+            ticker, asset_type = key
+            if asset_type in FIXED_PRICE_TYPES:
+                prices[key] = 1
+                on_resolved(key)
+            elif asset_type in MARKET_TYPES:
+                market_requests.append(key)
+            else:
+                print(f"Unsupported asset type: {asset_type}")
+                prices[key] = None
+                on_resolved(key)
+
+        if market_requests:
+            prices.update(self.fetch(market_requests, on_resolved))
+        return prices
+
+    def fetch(self, requests, on_resolved):
+        """
+        Resolve stock, ETF and crypto quotes.
+
+        Args:
+            requests (list): Unique (ticker, asset_type) pairs.
+            on_resolved (function): Called with each pair as soon as its
+                                    price is known, from the calling thread.
+
+        Returns:
+            dict: Mapping of (ticker, asset_type) to price, 0 on failure.
+        """
+        raise NotImplementedError
+
+    def get_daily_series(self, ticker, asset_type, outputsize="compact"):
+        """
+        Fetch daily closing prices for one asset.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): One of stock, etf or crypto.
+            outputsize (str): "compact" for recent history or "full".
+
+        Returns:
+            pd.Series: Closing prices indexed by date, or None on failure.
+        """
+        raise NotImplementedError(f"The {self.name} provider has no daily history")
+
+    def is_fresh(self, ticker, asset_type):
+        """
+        Check whether a previously resolved price is still current.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): The type of asset.
+
+        Returns:
+            bool: True if a price resolved earlier can be reused as-is.
+        """
+        return True
+
+    def reset_stats(self):
+        """Reset any per-run statistics the provider keeps."""
+
+    def get_stats(self):
+        """
+        Return the provider's per-run counters.
+
+        Returns:
+            dict: Counters such as `api_calls` and `cache_hits`; empty if the
+                  provider keeps none.
+        """
+        return {}
+
+    def summary(self):
+        """
+        Describe the provider's per-run statistics.
+
+        Returns:
+            str: A one-line summary, or None if there is nothing to report.
+        """
+        return None
+
+class AlphaVantageProvider(PriceProvider):
+    """
+    Live quotes from Alpha Vantage, backed by the on-disk quote cache.
+
+    Uncached stocks and ETFs go through the bulk quotes endpoint in chunks of
+    BULK_QUOTE_BATCH_SIZE symbols, with per-symbol requests for anything the
+    bulk path could not price; crypto pairs are resolved as their own batch
+    of exchange-rate requests. Requests run on a bounded thread pool and the
+    client's token bucket keeps them within the per-minute quota.
+    """
+
+    name = "alphavantage"
+
+    def __init__(self, client=None, max_workers=MAX_CONCURRENT_REQUESTS):
+        self.client = client or AlphaVantageClient()
+        self.max_workers = max_workers
+        self._quote_cache = None
+
+    @property
+    def quote_cache(self):
+        """QuoteCache: The on-disk quote cache, opened on first use."""
+        if self._quote_cache is None:
+            self._quote_cache = QuoteCache()
+        return self._quote_cache
+
+    def is_fresh(self, ticker, asset_type):
+        if asset_type not in MARKET_TYPES:
+            return True
+        return self.quote_cache.is_fresh(ticker, asset_type)
+
+    def reset_stats(self):
+        self.quote_cache.reset_stats()
+        self.client.request_count = 0
+
+    def get_stats(self):
+        stats = self.quote_cache.stats
+        return {
+            "api_calls": self.client.request_count,
+            "cache_hits": stats["hits"],
+            "cache_misses": stats["misses"],
+            "cache_stale": stats["stale"],
+        }
+
+    def summary(self):
+        return self.quote_cache.summary()
+
+    def get_daily_series(self, ticker, asset_type, outputsize="compact"):
+        try:
+            return self.client.daily_series(ticker, asset_type, outputsize)
+        except PriceFetchError as error:
+            print(f"Error fetching history for {ticker} ({asset_type}): {error}")
+            return None
+
+    def fetch_quote(self, ticker, asset_type):
+        """
+        Fetch a single stock, ETF or crypto quote from the API and cache it.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): One of stock, etf or crypto.
+
+        Returns:
+            float: The current price of the asset, or 0 if there's an error.
+        """
+        try:
+            price, source = self.client.quote(ticker, asset_type)
+        except PriceFetchError as error:
+            print(f"Error fetching price for {ticker} ({asset_type}): {error}")
+            return 0
+
+        self.quote_cache.set(ticker, asset_type, price, source)
+        return price
+
+    def fetch_bulk_quotes(self, symbols):
+        """
+        Fetch one chunk of stock/ETF symbols through the bulk quotes endpoint.
+
+        Args:
+            symbols (list): Up to BULK_QUOTE_BATCH_SIZE ticker symbols.
+
+        Returns:
+            dict: Mapping of symbol to price. Empty if the chunk failed or the
+                  API key's tier lacks bulk access (callers fall back to
+                  per-symbol requests for anything missing).
+        """
+        if not self.client.bulk_supported:
+            return {}
+
+        try:
+            return self.client.bulk_quotes(symbols)
+        except PremiumEndpointError:
+            print("Bulk quotes are not available for this API key. Falling back to per-symbol requests.")
+            self.client.bulk_supported = False
+        except PriceFetchError as error:
+            print(f"Error fetching bulk quotes for {len(symbols)} symbols: {error}")
+        return {}
+
+    def fetch(self, requests, on_resolved):
+        prices = {}
+        equities = {}
+        missing = []
+        for key in requests:
+            ticker, asset_type = key
+            cached_price = self.quote_cache.get(ticker, asset_type)
+            if cached_price is not None:
+                prices[key] = cached_price
+                on_resolved(key)
+            elif asset_type == "crypto" or not USE_BULK_QUOTES:
+                missing.append(key)
+            else:
+                equities.setdefault(ticker, []).append(asset_type)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Probe with the first chunk so a tier without bulk access costs one call
+            symbols = list(equities)
+            chunks = [symbols[i:i + BULK_QUOTE_BATCH_SIZE] for i in range(0, len(symbols), BULK_QUOTE_BATCH_SIZE)]
+            bulk_prices = self.fetch_bulk_quotes(chunks[0]) if chunks else {}
+            for chunk_prices in executor.map(self.fetch_bulk_quotes, chunks[1:]):
+                bulk_prices.update(chunk_prices)
+
+            for ticker, asset_types in equities.items():
+                for asset_type in asset_types:
+                    if ticker in bulk_prices:
+                        prices[(ticker, asset_type)] = bulk_prices[ticker]
+                        self.quote_cache.set(ticker, asset_type, bulk_prices[ticker], "REALTIME_BULK_QUOTES")
+                        on_resolved((ticker, asset_type))
+                    else:
+                        missing.append((ticker, asset_type))
+
+            futures = {executor.submit(self.fetch_quote, *key): key for key in missing}
+            for future in as_completed(futures):
+                prices[futures[future]] = future.result()
+                on_resolved(futures[future])
+
+        return prices
+
+class FixtureProvider(PriceProvider):
+    """
+    Offline quotes read from a local snapshot file.
+
+    The snapshot is a CSV, or a JSON list of records, with `Ticker`, `Type`
+    and `Price` columns. Runs against it are deterministic and need no
+    network access, which makes it suitable for CI and benchmarks.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path=PRICE_FIXTURE_FILE):
+        if os.path.splitext(path)[1].lower() == ".json":
+            fixture = pd.read_json(path, orient="records")
+        else:
+            fixture = pd.read_csv(path)
+
+        self.path = path
+        self.prices = {
+            (str(ticker).strip().upper(), str(asset_type).lower()): float(price)
+            for ticker, asset_type, price in zip(fixture["Ticker"], fixture["Type"], fixture["Price"])
+        }
+
+    def fetch(self, requests, on_resolved):
+        prices = {}
+        for key in requests:
+            if key not in self.prices:
+                print(f"No fixture price for {key[0]} ({key[1]}) in {self.path}")
+            prices[key] = self.prices.get(key, 0)
+            on_resolved(key)
+        return prices
+
+PROVIDERS = {
+    AlphaVantageProvider.name: AlphaVantageProvider,
+    FixtureProvider.name: FixtureProvider,
+}
+
+_providers = {}
+
+def get_provider(name=PRICE_PROVIDER):
+    """
+    Return the shared price provider for the given name.
+
+    Args:
+        name (str): A key of PROVIDERS. Defaults to the PRICE_PROVIDER setting.
+
+    Returns:
+        PriceProvider: The provider instance, created on first use.
+
+    Raises:
+        ValueError: If the provider name is unknown.
+    """
+    if name not in PROVIDERS:
+        raise ValueError(f"Price provider '{name}' does not exist. Available providers are: {', '.join(PROVIDERS)}.")
+    if name not in _providers:
+        _providers[name] = PROVIDERS[name]()
+    return _providers[name]
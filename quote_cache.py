@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from metrics import registry
+from config import (
+    MARKET_CLOSED_TTL_SECONDS,
+    QUOTE_CACHE_FILE,
+    QUOTE_TTL_SECONDS
+)
+
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+
+def is_market_open(now=None):
+    """
+    Check whether the US equity market is in its regular trading session.
+
+    Args:
+        now (datetime, optional): Moment to check. Defaults to the current time.
+
+    Returns:
+        bool: True between 9:30 and 16:00 Eastern on weekdays.
+    """
+    now = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    if now.weekday() >= 5:
+        return False
+    minutes = now.hour * 60 + now.minute
+    return 9 * 60 + 30 <= minutes < 16 * 60
+
+def get_ttl(asset_type, now=None):
+    """
+    Return how long a quote for the given asset type stays fresh.
+
+    Stock and ETF quotes do not move outside regular trading hours, so they
+    are kept much longer while the market is closed.
+
+    Args:
+        asset_type (str): The type of asset (e.g., stock, etf, crypto, etc.).
+        now (datetime, optional): Moment to evaluate market hours at.
+
+    Returns:
+        int: Time-to-live in seconds.
+    """
+    if asset_type in ["stock", "etf"] and not is_market_open(now):
+        return MARKET_CLOSED_TTL_SECONDS
+    return QUOTE_TTL_SECONDS.get(asset_type, QUOTE_TTL_SECONDS["default"])
+
+class QuoteCache:
+    """
+    Persistent SQLite cache of quotes keyed by (ticker, asset_type).
+
+    Safe to share across the fetch threads; every access is serialized on a
+    single connection.
+    """
+
+    def __init__(self, path=QUOTE_CACHE_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS quotes (
+                ticker TEXT NOT NULL,
+                asset_type TEXT NOT NULL,
+                price REAL NOT NULL,
+                fetched_at REAL NOT NULL,
+                source TEXT NOT NULL,
+                PRIMARY KEY (ticker, asset_type)
+            )
+            """
+        )
+        self.connection.commit()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the hit/miss/stale counters."""
+        self.stats = {"hits": 0, "misses": 0, "stale": 0}
+
+    def get(self, ticker, asset_type):
+        """
+        Look up a fresh quote.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): The type of asset.
+
+        Returns:
+            float: The cached price, or None if missing or expired.
+        """
+        key = (str(ticker).upper(), asset_type)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT price, fetched_at FROM quotes WHERE ticker = ? AND asset_type = ?",
+                key
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                registry.inc("portfolio_quote_cache_requests_total", result="miss")
+                return None
+            price, fetched_at = row
+            if time.time() - fetched_at > get_ttl(asset_type):
+                self.stats["stale"] += 1
+                registry.inc("portfolio_quote_cache_requests_total", result="stale")
+                return None
+            self.stats["hits"] += 1
+            registry.inc("portfolio_quote_cache_requests_total", result="hit")
+            return price
+
+    def is_fresh(self, ticker, asset_type):
+        """
+        Check for a fresh quote without counting it in the statistics.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): The type of asset.
+
+        Returns:
+            bool: True if a quote exists and has not expired.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT fetched_at FROM quotes WHERE ticker = ? AND asset_type = ?",
+                (str(ticker).upper(), asset_type)
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= get_ttl(asset_type)
+
+    def set(self, ticker, asset_type, price, source):
+        """
+        Store a freshly fetched quote.
+
+        Args:
+            ticker (str): The asset ticker symbol.
+            asset_type (str): The type of asset.
+            price (float): The fetched price.
+            source (str): Where the price came from (e.g., the API function).
+        """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO quotes (ticker, asset_type, price, fetched_at, source) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (str(ticker).upper(), asset_type, float(price), time.time(), source)
+            )
+            self.connection.commit()
+
+    def summary(self):
+        """
+        Format the cache statistics for the end-of-run report.
+
+        Returns:
+            str: A one-line hits/misses/stale summary.
+        """
+        total = sum(self.stats.values())
+        hit_rate = (self.stats["hits"] / total) * 100 if total else 0
+        return (f"Quote cache: {self.stats['hits']} hits, {self.stats['misses']} misses, "
+                f"{self.stats['stale']} stale ({hit_rate:.0f}% hit rate)")
@@ -0,0 +1,108 @@
+import argparse
+import fcntl
+import os
+import time
+from calculate_portfolio import calculate_portfolio
+from price_providers import get_provider
+from quote_cache import is_market_open
+from snapshots import calculation_lock, publish_snapshot
+from config import (
+    INPUT_FILE,
+    REFRESH_CLOSED_INTERVAL_SECONDS,
+    REFRESH_INTERVAL_SECONDS,
+    SNAPSHOT_DIR,
+    TEMP_FILE
+)
+
+def get_refresh_interval(now=None):
+    """
+    Return how long to wait before the next refresh.
+
+    Args:
+        now (datetime, optional): Moment to evaluate market hours at.
+
+    Returns:
+        int: Seconds until the next refresh.
+    """
+    return REFRESH_INTERVAL_SECONDS if is_market_open(now) else REFRESH_CLOSED_INTERVAL_SECONDS
+
+def refresh_once(input_file, output_file, provider):
+    """
+    Re-value the portfolio incrementally and publish the result as a snapshot.
+
+    Only rows that changed or whose quote expired are priced again, and the
+    provider's rate limiter and quote cache are shared across refreshes, so
+    a refresh costs no more API calls than the prices that actually moved.
+
+    Args:
+        input_file (str): Path to the input portfolio CSV.
+        output_file (str): Path of the working output.
+        provider (PriceProvider): Price source, reused across refreshes.
+
+    Returns:
+        dict: The published snapshot pointer, or None if nothing was published.
+    """
+    with calculation_lock(blocking=False) as acquired:
+        if not acquired:
+            print("A calculation is already running; skipping this refresh.")
+            return None
+        report = calculate_portfolio(input_file, output_file, provider, incremental=True)
+        if report is None:
+            return None
+        pointer = publish_snapshot(output_file)
+    print(f"Published snapshot {pointer['version']}")
+    return pointer
+
+def run_refresher(input_file=INPUT_FILE, output_file=TEMP_FILE, once=False, interval=None):
+    """
+    Refresh the portfolio on a schedule until interrupted.
+
+    Only one refresher runs at a time; a second one exits immediately. A
+    failed refresh (network outage, malformed input) is reported and retried
+    at the next interval instead of stopping the loop.
+
+    Args:
+        input_file (str): Path to the input portfolio CSV.
+        output_file (str): Path of the working output.
+        once (bool): Refresh a single time and return.
+        interval (int, optional): Fixed seconds between refreshes. Defaults
+                                  to a schedule that follows market hours.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_DIR, ".refresher.lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print("The refresher is already running.")
+            return
+
+        provider = get_provider()
+        try:
+            while True:
+                try:
+                    refresh_once(input_file, output_file, provider)
+                except Exception as error:
+                    print(f"Refresh failed: {error}")
+                if once:
+                    return
+                wait = interval or get_refresh_interval()
+                print(f"Next refresh in {wait:,}s")
+                time.sleep(wait)
+        except KeyboardInterrupt:
+            pass
+
+def parse_refresher_args():
+    """
+    Parse command-line arguments for the refresher.
+
+    Returns:
+        argparse.Namespace: Parsed arguments with `once` and `interval`.
+    """
+    parser = argparse.ArgumentParser(description="Refresh portfolio prices in the background")
+    parser.add_argument("--once", action="store_true", help="Refresh a single time and exit")
+    parser.add_argument("--interval", type=int, default=None, help="Fixed seconds between refreshes")
+    return parser.parse_known_args()[0]
+
+if __name__ == "__main__":
+    args = parse_refresher_args()
+    run_refresher(once=args.once, interval=args.interval)
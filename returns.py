@@ -0,0 +1,278 @@
+import numpy as np
+import pandas as pd
+
+DAYS_PER_YEAR = 365
+# Bracket for the solver in log space: rates from about -100% to about +2,200,000% a year
+LOG_RATE_BOUNDS = (-10.0, 10.0)
+XIRR_TOLERANCE = 1e-10
+XIRR_MAX_ITERATIONS = 100
+
+def get_lot_flows(portfolio, valued, now):
+    """
+    Describe every lot that has a return as units bought at a cost on a date.
+
+    Market-priced lots buy `Quantity` units at `Cost Basis` each. Cash buys
+    `Quantity` units at 1. 401k and HSA lots buy `Cost Basis` units at 1,
+    so that their current unit price is `Value / Cost Basis`. Lots without a
+    valid purchase date before `now`, or with nothing invested, have no
+    return and are left out.
+
+    Args:
+        portfolio (pd.DataFrame): Valued portfolio with normalized `Type`.
+        valued (np.ndarray): Boolean mask of rows that were valued.
+        now (pd.Timestamp): Reference time shared by the whole run.
+
+    Returns:
+        pd.DataFrame: `Ticker`, `Type`, `Date`, `Units`, `Invested` and
+                      `Value` columns, indexed like the included rows.
+    """
+    asset_type = portfolio["Type"]
+    quantity = portfolio["Quantity"].astype(float)
+    cost_basis = portfolio["Cost Basis"].astype(float) if "Cost Basis" in portfolio else pd.Series(0.0, index=portfolio.index)
+    purchase_dates = portfolio["Purchase Date"] if "Purchase Date" in portfolio else pd.Series(None, index=portfolio.index)
+
+    is_cash = (asset_type == "cash").to_numpy(dtype=bool)
+    is_fixed = asset_type.isin(["401k", "hsa"]).to_numpy(dtype=bool)
+    units = np.select([is_cash, is_fixed], [quantity, cost_basis], quantity)
+    invested = np.select([is_cash, is_fixed], [quantity, cost_basis], quantity * cost_basis)
+
+    flows = pd.DataFrame({
+        "Ticker": portfolio["Ticker"].astype(str).str.strip().str.upper(),
+        "Type": asset_type,
+        "Date": pd.to_datetime(purchase_dates.astype(str), format="%Y-%m-%d", errors="coerce"),
+        "Units": units,
+        "Invested": invested,
+        "Value": portfolio["Value"].astype(float),
+    }, index=portfolio.index)
+
+    included = valued & (flows["Date"] < now).to_numpy() & (units > 0) & (invested > 0)
+    return flows[included]
+
+def aggregate_flows(flows):
+    """
+    Combine lots of the same asset bought on the same day.
+
+    Args:
+        flows (pd.DataFrame): Output of `get_lot_flows` (possibly several
+                              concatenated chunks of it).
+
+    Returns:
+        pd.DataFrame: One row per (`Ticker`, `Type`, `Date`) with summed
+                      `Units`, `Invested` and `Value`.
+    """
+    return flows.groupby(["Ticker", "Type", "Date"], as_index=False)[["Units", "Invested", "Value"]].sum()
+
+def years_before(dates, now):
+    """
+    Measure how long before `now` each date is, in years.
+
+    Args:
+        dates (pd.Series): Datetime values.
+        now (pd.Timestamp): Reference time.
+
+    Returns:
+        np.ndarray: float64 years.
+    """
+    return ((now - dates).dt.days / DAYS_PER_YEAR).to_numpy(dtype="float64")
+
+def xirr(amounts, years):
+    """
+    Solve the annual money-weighted return of many cash-flow series at once.
+
+    Each row is one series. The solver works on log(1 + rate) and takes
+    Newton steps for every row together. A step that leaves the row's
+    bracket falls back to bisection, so every row with a sign change in
+    its future value converges.
+
+    Args:
+        amounts (np.ndarray): (series, flows) cash flows, negative for money
+                              invested and positive for money returned.
+                              Padding entries are 0.
+        years (np.ndarray): Matching years before the valuation date (>= 0).
+
+    Returns:
+        np.ndarray: Annual rates, NaN for series without a solution.
+    """
+    def future_value(log_rate):
+        growth = np.exp(np.minimum(log_rate[:, None] * years, 700.0))
+        return (amounts * growth).sum(axis=1), (amounts * years * growth).sum(axis=1)
+
+    count = len(amounts)
+    low = np.full(count, LOG_RATE_BOUNDS[0])
+    high = np.full(count, LOG_RATE_BOUNDS[1])
+    low_value, _ = future_value(low)
+    high_value, _ = future_value(high)
+    solvable = np.sign(low_value) * np.sign(high_value) < 0
+
+    # Start from the rate that compounds total money in to total money out over the average age
+    invested = -np.where(amounts < 0, amounts, 0).sum(axis=1)
+    returned = np.where(amounts > 0, amounts, 0).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_years = (np.where(amounts < 0, -amounts * years, 0).sum(axis=1)) / invested
+        log_rate = np.log(returned / invested) / average_years
+    log_rate = np.where(np.isfinite(log_rate), log_rate, 0.0).clip(low + 1e-9, high - 1e-9)
+
+    active = solvable.copy()
+    for _ in range(XIRR_MAX_ITERATIONS):
+        if not active.any():
+            break
+        value, slope = future_value(log_rate)
+
+        # Shrink each bracket around the root
+        same_side = np.sign(value) == np.sign(low_value)
+        low = np.where(same_side, log_rate, low)
+        low_value = np.where(same_side, value, low_value)
+        high = np.where(same_side, high, log_rate)
+        high_value = np.where(same_side, high_value, value)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = log_rate - value / slope
+        converged = (np.abs(step - log_rate) < XIRR_TOLERANCE) | (high - low < XIRR_TOLERANCE) | (value == 0)
+        bisect = ~np.isfinite(step) | (step < low) | (step > high)
+        step = np.where(bisect, (low + high) / 2, step)
+
+        log_rate = np.where(active, step, log_rate)
+        active &= ~converged
+
+    return np.where(solvable, np.expm1(log_rate), np.nan)
+
+def get_cash_flow_matrix(flows, groups, now):
+    """
+    Lay out each group's cash flows as one padded row per group.
+
+    Args:
+        flows (pd.DataFrame): Aggregated flows from `aggregate_flows`.
+        groups (pd.Series): Group label for every flow row.
+        now (pd.Timestamp): Valuation time; the group's value is returned then.
+
+    Returns:
+        tuple: (group labels, amounts, years) where amounts and years are
+               (groups, flows + 1) arrays ready for `xirr`.
+    """
+    by_date = (
+        flows.assign(Group=groups.to_numpy())
+        .groupby(["Group", "Date"], as_index=False)[["Invested", "Value"]].sum()
+    )
+    by_date["Position"] = by_date.groupby("Group").cumcount()
+    labels = by_date["Group"].drop_duplicates().to_numpy()
+    row = pd.Index(labels).get_indexer(by_date["Group"])
+
+    width = by_date["Position"].max() + 2 if len(by_date) else 1
+    amounts = np.zeros((len(labels), width))
+    years = np.zeros((len(labels), width))
+    amounts[row, by_date["Position"]] = -by_date["Invested"].to_numpy()
+    years[row, by_date["Position"]] = years_before(by_date["Date"], now)
+
+    # The final column holds the current value, received at the valuation time
+    amounts[:, -1] = by_date.groupby("Group", sort=False)["Value"].sum().reindex(labels).to_numpy()
+    return labels, amounts, years
+
+def time_weighted_returns(flows, groups, now):
+    """
+    Compute each group's annual time-weighted return.
+
+    The group is revalued on every purchase date, marking each asset at the
+    last price it was bought at (only assets bought that day change value),
+    and the returns of the periods between
+    purchases are chained up to today's value. Money added on a purchase date
+    therefore does not count as growth. For a single asset the chain reduces
+    to its current price over its first purchase price.
+
+    Args:
+        flows (pd.DataFrame): Aggregated flows from `aggregate_flows`.
+        groups (pd.Series): Group label for every flow row.
+        now (pd.Timestamp): Valuation time.
+
+    Returns:
+        pd.Series: Annual rates indexed by group label.
+    """
+    assets = (
+        flows.assign(Group=groups.to_numpy())
+        .groupby(["Group", "Ticker", "Type", "Date"], as_index=False)[["Units", "Invested", "Value"]].sum()
+    )
+    assets["Mark"] = assets["Invested"] / assets["Units"]
+
+    # Revalue the units already held whenever an asset is bought at a new price
+    assets = assets.sort_values(["Group", "Ticker", "Type", "Date"])
+    by_asset = assets.groupby(["Group", "Ticker", "Type"], sort=False)
+    held_before = by_asset["Units"].cumsum() - assets["Units"]
+    assets["Revaluation"] = (held_before * (assets["Mark"] - by_asset["Mark"].shift())).fillna(0.0)
+
+    # Group value just before and just after the money added on each purchase date
+    periods = assets.groupby(["Group", "Date"], as_index=False)[["Revaluation", "Invested"]].sum()
+    periods["After"] = (periods["Revaluation"] + periods["Invested"]).groupby(periods["Group"]).cumsum()
+    periods["Before"] = periods["After"] - periods["Invested"]
+
+    current_value = assets.groupby("Group")["Value"].sum()
+    period_end = periods.groupby("Group")["Before"].shift(-1)
+    period_end = period_end.fillna(periods["Group"].map(current_value))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        periods["Log Growth"] = np.log(period_end / periods["After"])
+    summary = periods.groupby("Group").agg(log_growth=("Log Growth", "sum"), start=("Date", "min"))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        rates = np.expm1(summary["log_growth"] / years_before(summary["start"], now))
+    return pd.Series(np.where(np.isfinite(rates), rates, np.nan), index=summary.index)
+
+def apply_lot_returns(portfolio, valued, now):
+    """
+    Add `% XIRR` and `% TWR` columns for every lot.
+
+    A lot is a single purchase valued today, so its money-weighted and
+    time-weighted returns are the same annualized holding return.
+
+    Args:
+        portfolio (pd.DataFrame): The valued portfolio.
+        valued (np.ndarray): Boolean mask of rows that were valued.
+        now (pd.Timestamp): Reference time shared by the whole run.
+
+    Returns:
+        tuple: (portfolio with the return columns, the lots' flows from
+               `get_lot_flows` for the group summary)
+    """
+    flows = get_lot_flows(portfolio, valued, now)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        rates = (flows["Value"] / flows["Invested"]) ** (1 / years_before(flows["Date"], now)) - 1
+    rates = rates.where(np.isfinite(rates)) * 100
+
+    portfolio["% XIRR"] = rates.reindex(portfolio.index)
+    portfolio["% TWR"] = portfolio["% XIRR"]
+    return portfolio, flows
+
+def summarize_returns(flows, now):
+    """
+    Compute money-weighted and time-weighted returns per ticker, per type and
+    for the whole portfolio.
+
+    All groups of a level go through the solver as one batch.
+
+    Args:
+        flows (pd.DataFrame): Lot flows from `get_lot_flows` or `aggregate_flows`.
+        now (pd.Timestamp): Valuation time.
+
+    Returns:
+        pd.DataFrame: `Level` ("Ticker", "Type" or "Portfolio"), `Name`,
+                      `Since`, `Invested`, `Value`, `% XIRR` and `% TWR`.
+    """
+    flows = aggregate_flows(flows)
+    levels = {
+        "Ticker": flows["Ticker"],
+        "Type": flows["Type"],
+        "Portfolio": pd.Series("Total", index=flows.index),
+    }
+
+    summaries = []
+    for level, groups in levels.items():
+        labels, amounts, years = get_cash_flow_matrix(flows, groups, now)
+        totals = flows.groupby(groups)[["Invested", "Value"]].sum().reindex(labels)
+        since = flows["Date"].groupby(groups).min().reindex(labels)
+        summaries.append(pd.DataFrame({
+            "Level": level,
+            "Name": labels,
+            "Since": since.dt.strftime("%Y-%m-%d").to_numpy(),
+            "Invested": totals["Invested"].to_numpy(),
+            "Value": totals["Value"].to_numpy(),
+            "% XIRR": xirr(amounts, years) * 100,
+            "% TWR": time_weighted_returns(flows, groups, now).reindex(labels).to_numpy() * 100,
+        }))
+    return pd.concat(summaries, ignore_index=True)
@@ -0,0 +1,232 @@
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from portfolio_io import read_portfolio
+from price_history import PriceHistoryStore, to_day_numbers
+from price_providers import MARKET_TYPES
+from snapshots import get_latest_portfolio_file
+from config import (
+    RISK_BATCH_SIZE,
+    RISK_CONFIDENCE_LEVELS,
+    RISK_HORIZONS_DAYS,
+    RISK_LOOKBACK_DAYS,
+    RISK_PATHS,
+    RISK_SEED,
+    TEMP_FILE
+)
+
+def get_positions(portfolio):
+    """
+    Total the current value held in each asset.
+
+    Args:
+        portfolio (pd.DataFrame): Computed portfolio with lower-case `Type`.
+
+    Returns:
+        pd.DataFrame: `Ticker`, `Type` and `Value` per asset with a positive value.
+    """
+    valued = portfolio[portfolio["Ticker"].notna() & (portfolio["Value"] > 0)]
+    valued = valued.assign(Ticker=valued["Ticker"].astype(str).str.strip().str.upper())
+    positions = valued.groupby(["Ticker", "Type"], as_index=False)["Value"].sum()
+    return positions
+
+def get_daily_returns(positions, store=None, lookback_days=RISK_LOOKBACK_DAYS, end=None):
+    """
+    Build the matrix of daily log returns for the market-priced positions.
+
+    Closes come from the local price history, forward-filled onto US
+    business days so every asset shares the same dates.
+
+    Args:
+        positions (pd.DataFrame): Output of `get_positions`.
+        store (PriceHistoryStore, optional): Source of stored closes.
+        lookback_days (int): Number of daily returns to use.
+        end (pd.Timestamp, optional): Last day of the window. Defaults to today.
+
+    Returns:
+        tuple: (returns as a (days, assets) array, boolean mask of the
+               positions that have full history over the window)
+    """
+    store = store or PriceHistoryStore()
+    end = (end or pd.Timestamp.now()).normalize()
+    day_numbers = to_day_numbers(pd.bdate_range(end=end, periods=lookback_days + 1))
+
+    closes = np.full((len(day_numbers), len(positions)), np.nan)
+    for column, (ticker, asset_type) in enumerate(zip(positions["Ticker"], positions["Type"])):
+        if asset_type in MARKET_TYPES:
+            closes[:, column] = store.closes_on(ticker, asset_type, day_numbers)
+
+    has_history = np.isfinite(closes).all(axis=0) & (closes > 0).all(axis=0)
+    for ticker, asset_type in positions.loc[~has_history & positions["Type"].isin(MARKET_TYPES).to_numpy(), ["Ticker", "Type"]].itertuples(index=False):
+        print(f"Not enough price history for {ticker} ({asset_type}); treating it as riskless. Run backfill_history.py first.")
+
+    returns = np.diff(np.log(closes[:, has_history]), axis=0)
+    return returns, has_history
+
+def get_cholesky(covariance):
+    """
+    Factor a covariance matrix, nudging the diagonal if it is not positive definite.
+
+    Sample covariances of many assets over a short window are often singular,
+    so a small, growing multiple of the average variance is added until the
+    factorization succeeds.
+
+    Args:
+        covariance (np.ndarray): (assets, assets) covariance matrix.
+
+    Returns:
+        np.ndarray: Lower-triangular L with L @ L.T ≈ covariance.
+    """
+    jitter = 0.0
+    scale = max(np.trace(covariance) / max(len(covariance), 1), 1e-12)
+    while True:
+        try:
+            return np.linalg.cholesky(covariance + jitter * np.eye(len(covariance)))
+        except np.linalg.LinAlgError:
+            jitter = scale * 1e-10 if jitter == 0 else jitter * 10
+
+def simulate_batch(seed, paths, mean, cholesky, values, membership, horizons, keep):
+    """
+    Simulate one batch of paths and keep each group's worst outcomes.
+
+    Daily log returns are i.i.d. normal, so the return over `h` days is drawn
+    directly from N(h * mean, h * covariance). Runs in a worker process.
+
+    Args:
+        seed (np.random.SeedSequence): This batch's independent stream.
+        paths (int): Number of paths in the batch.
+        mean (np.ndarray): Mean daily log return per asset.
+        cholesky (np.ndarray): Cholesky factor of the daily covariance.
+        values (np.ndarray): Current value per asset.
+        membership (np.ndarray): (assets, groups) 0/1 matrix mapping assets
+                                 to the groups reported on.
+        horizons (list): Horizons in trading days.
+        keep (int): Number of worst profit-and-loss outcomes to return.
+
+    Returns:
+        dict: Horizon to a (keep, groups) array of the lowest P&Ls per group.
+    """
+    rng = np.random.default_rng(seed)
+    tails = {}
+    for horizon in horizons:
+        shocks = rng.standard_normal((paths, len(mean))) @ cholesky.T
+        log_returns = horizon * mean + math.sqrt(horizon) * shocks
+        profit_loss = np.expm1(log_returns) @ (values[:, None] * membership)
+        count = min(keep, paths)
+        tails[horizon] = np.partition(profit_loss, count - 1, axis=0)[:count]
+    return tails
+
+def simulate_risk(positions, returns, has_history, paths=RISK_PATHS, horizons=RISK_HORIZONS_DAYS,
+                  confidence_levels=RISK_CONFIDENCE_LEVELS, seed=RISK_SEED, batch_size=RISK_BATCH_SIZE,
+                  max_workers=None):
+    """
+    Estimate Value-at-Risk and Conditional Value-at-Risk by Monte Carlo.
+
+    Paths are split into batches of `batch_size`, each drawn from its own
+    child of one SeedSequence, so results depend only on `seed`, `paths`
+    and `batch_size`, not on how many workers run the batches. Only each
+    batch's worst outcomes are sent back, which is all VaR and CVaR need.
+
+    Args:
+        positions (pd.DataFrame): Output of `get_positions`.
+        returns (np.ndarray): Daily log returns of the positions with history.
+        has_history (np.ndarray): Mask of the positions `returns` covers.
+        paths (int): Total number of simulated paths.
+        horizons (list): Horizons in trading days.
+        confidence_levels (list): Confidence levels such as 0.95 or 0.99.
+        seed (int): Root seed of the simulation.
+        batch_size (int): Paths per worker task.
+        max_workers (int, optional): Worker processes. Defaults to the CPU count.
+
+    Returns:
+        pd.DataFrame: `Group` (each Type, then "Total"), `Horizon`,
+                      `Confidence`, `VaR` and `CVaR` as positive dollar losses.
+    """
+    groups = sorted(positions["Type"].unique()) + ["Total"]
+    risky = positions[has_history]
+    membership = np.column_stack([
+        *[(risky["Type"] == group).to_numpy(dtype=float) for group in groups[:-1]],
+        np.ones(len(risky))
+    ])
+
+    results = []
+    if len(risky) and len(returns) > 1:
+        mean = returns.mean(axis=0)
+        cholesky = get_cholesky(np.atleast_2d(np.cov(returns, rowvar=False)))
+        values = risky["Value"].to_numpy(dtype=float)
+
+        keep = max(math.ceil(paths * (1 - min(confidence_levels))), 1)
+        batches = [min(batch_size, paths - start) for start in range(0, paths, batch_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(batches))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(simulate_batch, batch_seed, batch_paths, mean, cholesky, values, membership, horizons, keep)
+                for batch_seed, batch_paths in zip(seeds, batches)
+            ]
+            tails = [future.result() for future in futures]
+
+        for horizon in horizons:
+            worst = np.sort(np.concatenate([tail[horizon] for tail in tails]), axis=0)
+            for confidence in confidence_levels:
+                count = max(math.ceil(paths * (1 - confidence)), 1)
+                # Losses only; adding 0.0 turns the -0.0 of riskless groups into 0.0
+                value_at_risk = np.maximum(-worst[count - 1], 0.0) + 0.0
+                conditional = np.maximum(-worst[:count].mean(axis=0), 0.0) + 0.0
+                results.extend(
+                    (group, horizon, confidence, float(value_at_risk[column]), float(conditional[column]))
+                    for column, group in enumerate(groups)
+                )
+    else:
+        results = [
+            (group, horizon, confidence, 0.0, 0.0)
+            for horizon in horizons for confidence in confidence_levels for group in groups
+        ]
+
+    return pd.DataFrame(results, columns=["Group", "Horizon", "Confidence", "VaR", "CVaR"])
+
+def calculate_risk(portfolio_file, paths=RISK_PATHS, seed=RISK_SEED, max_workers=None):
+    """
+    Report VaR and CVaR by Type and overall for a computed portfolio.
+
+    Cash, 401k, HSA and other types without market history are treated as
+    riskless.
+
+    Args:
+        portfolio_file (str): Path to the computed portfolio.
+        paths (int): Total number of simulated paths.
+        seed (int): Root seed of the simulation.
+        max_workers (int, optional): Worker processes. Defaults to the CPU count.
+
+    Returns:
+        pd.DataFrame: The output of `simulate_risk`.
+    """
+    positions = get_positions(read_portfolio(portfolio_file))
+    returns, has_history = get_daily_returns(positions)
+    report = simulate_risk(positions, returns, has_history, paths=paths, seed=seed, max_workers=max_workers)
+
+    print(f"Monte Carlo risk over {paths:,} paths ({len(returns)} days of history)")
+    for (horizon, confidence), rows in report.groupby(["Horizon", "Confidence"]):
+        print(f"{horizon}-day at {confidence:.0%}:")
+        for row in rows.itertuples(index=False):
+            print(f"  {str(row.Group).upper():<10} VaR ${row.VaR:,.2f}  CVaR ${row.CVaR:,.2f}")
+    return report
+
+def parse_risk_args():
+    """
+    Parse command-line arguments for the risk report.
+
+    Returns:
+        argparse.Namespace: Parsed arguments with `paths`, `seed` and `workers`.
+    """
+    parser = argparse.ArgumentParser(description="Monte Carlo Value-at-Risk")
+    parser.add_argument("--paths", type=int, default=RISK_PATHS, help="Number of simulated paths")
+    parser.add_argument("--seed", type=int, default=RISK_SEED, help="Root seed for reproducible results")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_risk_args()
+    calculate_risk(get_latest_portfolio_file(TEMP_FILE), paths=args.paths, seed=args.seed, max_workers=args.workers)
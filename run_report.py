@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from portfolio_io import atomic_path
+from config import PROGRESS_WRITE_SECONDS
+
+STAGES = ["load", "fetch", "compute", "save"]
+
+class RunReport:
+    """
+    Timings and counters collected over one portfolio calculation.
+
+    Stages can be entered several times (once per chunk when streaming);
+    their durations add up. With a progress file, the current stage and the
+    number of quotes resolved so far are written there while the run is in
+    progress, so another process can follow it.
+    """
+
+    def __init__(self, mode, input_file, output_file, progress_file=None):
+        self.started = time.perf_counter()
+        self.data = {
+            "mode": mode,
+            "input_file": input_file,
+            "output_file": output_file,
+            "started_at": time.time(),
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "timings": {stage: 0.0 for stage in STAGES},
+        }
+        self.progress_file = progress_file
+        self.progress = {"started_at": self.data["started_at"], "stage": None, "done": 0, "total": 0, "ticker": None}
+        self.progress_written = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a block of work and add it to the named stage.
+
+        Args:
+            name (str): One of STAGES.
+        """
+        started = time.perf_counter()
+        if self.progress["stage"] != name:
+            self.set_progress(stage=name)
+        try:
+            yield
+        finally:
+            self.data["timings"][name] = self.data["timings"].get(name, 0.0) + time.perf_counter() - started
+
+    def update(self, **fields):
+        """Record counters or other fields in the report."""
+        self.data.update(fields)
+
+    def set_progress(self, force=False, **fields):
+        """
+        Record progress fields and write them to the progress file.
+
+        Writes are spaced at least PROGRESS_WRITE_SECONDS apart so a large
+        batch of cached quotes does not turn into a file write per ticker.
+
+        Args:
+            force (bool): Write even if the last write was too recent.
+            **fields: Progress fields such as `stage`, `done` or `ticker`.
+        """
+        self.progress.update(fields)
+        if self.progress_file is None:
+            return
+        now = time.monotonic()
+        if not force and now - self.progress_written < PROGRESS_WRITE_SECONDS:
+            return
+        self.progress_written = now
+        self.progress["updated_at"] = time.time()
+        with atomic_path(self.progress_file) as temp_path:
+            with open(temp_path, "w") as progress_file:
+                json.dump(self.progress, progress_file)
+
+    def quote_resolved(self, done, total, key):
+        """
+        Record one more resolved quote; usable as a provider's `progress` callback.
+
+        Args:
+            done (int): Quotes resolved so far.
+            total (int): Quotes requested.
+            key (tuple): The (ticker, asset_type) pair just resolved.
+        """
+        self.set_progress(force=done == total, done=done, total=total, ticker=key[0])
+
+    def save(self, path):
+        """
+        Finish the report and write it atomically as JSON.
+
+        Args:
+            path (str): Destination of the report.
+        """
+        self.data["timings"]["total"] = time.perf_counter() - self.started
+        self.data["finished"] = datetime.now().isoformat(timespec="seconds")
+        with atomic_path(path) as temp_path:
+            with open(temp_path, "w") as report_file:
+                json.dump(self.data, report_file, indent=2)
+        self.set_progress(force=True, stage="done")
+
+def load_report(path):
+    """
+    Read a run report.
+
+    Args:
+        path (str): Path of the report.
+
+    Returns:
+        dict: The report, or None if it does not exist or is unreadable.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as report_file:
+            return json.load(report_file)
+    except (OSError, ValueError):
+        return None
+
+def format_progress(progress):
+    """
+    Describe how far a running calculation has got.
+
+    Args:
+        progress (dict): A progress file written by `RunReport.set_progress`.
+
+    Returns:
+        str: The current stage, with the quote count while fetching.
+    """
+    line = (progress["stage"] or "starting").title()
+    if progress["stage"] == "fetch" and progress["total"]:
+        line += f": {progress['done']:,}/{progress['total']:,} quotes"
+        if progress["ticker"]:
+            line += f" (last {progress['ticker']})"
+    return line
+
+def format_report(report, show_dollar=True):
+    """
+    Summarize a run report in a few human-readable lines.
+
+    Args:
+        report (dict): A report written by `RunReport.save`.
+        show_dollar (bool): Whether to include the total value.
+
+    Returns:
+        list: Lines describing where the time went and what was fetched.
+    """
+    timings = report["timings"]
+    lines = [
+        f"Finished {report['finished']} in {timings['total']:.2f}s ("
+        + ", ".join(f"{stage} {timings.get(stage, 0.0):.2f}s" for stage in STAGES) + ")",
+        f"Rows: {report.get('rows', 0):,} ({report.get('skipped_rows', 0):,} skipped"
+        + (f", {report['reused_rows']:,} carried forward" if "reused_rows" in report else "") + ")",
+        f"Quotes: {report.get('unique_quotes', 0):,} unique, {report.get('api_calls', 0):,} API calls, "
+        f"{report.get('cache_hits', 0):,} cache hits",
+    ]
+    failed = report.get("failed_tickers", [])
+    if failed:
+        lines.append(f"Failed tickers ({len(failed)}): {', '.join(failed[:10])}" + (", ..." if len(failed) > 10 else ""))
+    if show_dollar and "total_value" in report:
+        lines.append(f"Total value: ${report['total_value']:,.2f}")
+    return lines
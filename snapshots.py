@@ -0,0 +1,136 @@
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+from portfolio_io import atomic_path, get_report_file, get_returns_file
+from config import SNAPSHOT_DIR, SNAPSHOT_KEEP
+
+@contextmanager
+def calculation_lock(blocking=True):
+    """
+    Hold the lock that serializes calculations writing the shared output.
+
+    The refresher and a manual "Calculate Portfolio" click both write the
+    same output file and state; the lock keeps one from publishing the
+    other's half-written run.
+
+    Args:
+        blocking (bool): Wait for the lock instead of giving up at once.
+
+    Yields:
+        bool: Whether the lock was acquired.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_DIR, ".lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def link_or_copy(source, destination):
+    """
+    Hard-link a file into a snapshot, copying it where links are unsupported.
+
+    Outputs are always replaced by renaming a new file over them, so a link
+    keeps the old contents after the next run.
+
+    Args:
+        source (str): File to snapshot.
+        destination (str): Path inside the snapshot directory.
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+def publish_snapshot(output_file, snapshot_dir=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+    """
+    Freeze the current output and its sidecars as a new snapshot version.
+
+    The LATEST pointer is replaced only after every file is in place, so a
+    reader always finds a complete snapshot.
+
+    Args:
+        output_file (str): Path of the processed portfolio.
+        snapshot_dir (str): Directory holding one subdirectory per version.
+        keep (int): Older versions to keep besides the new one.
+
+    Returns:
+        dict: The new pointer (`version`, `path`, `created`, `created_at`).
+    """
+    now = datetime.now()
+    version = now.strftime("%Y%m%dT%H%M%S%f")
+    directory = os.path.join(snapshot_dir, version)
+    os.makedirs(directory, exist_ok=True)
+    for source in [output_file, get_returns_file(output_file), get_report_file(output_file)]:
+        if os.path.exists(source):
+            link_or_copy(source, os.path.join(directory, os.path.basename(source)))
+
+    pointer = {
+        "version": version,
+        "path": os.path.join(directory, os.path.basename(output_file)),
+        "created": now.isoformat(timespec="seconds"),
+        "created_at": now.timestamp(),
+    }
+    with atomic_path(os.path.join(snapshot_dir, "LATEST")) as temp_path:
+        with open(temp_path, "w") as pointer_file:
+            json.dump(pointer, pointer_file)
+    prune_snapshots(snapshot_dir, keep)
+    return pointer
+
+def prune_snapshots(snapshot_dir=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+    """
+    Delete all but the newest snapshot versions.
+
+    Args:
+        snapshot_dir (str): Directory holding one subdirectory per version.
+        keep (int): Older versions to keep besides the newest.
+    """
+    # Version names sort chronologically
+    versions = sorted(
+        name for name in os.listdir(snapshot_dir)
+        if os.path.isdir(os.path.join(snapshot_dir, name)) and not name.startswith(".")
+    )
+    for version in versions[:-(keep + 1)]:
+        shutil.rmtree(os.path.join(snapshot_dir, version), ignore_errors=True)
+
+def get_latest_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Read the pointer to the newest snapshot.
+
+    Args:
+        snapshot_dir (str): Directory holding the snapshots.
+
+    Returns:
+        dict: The pointer written by `publish_snapshot`, or None if no
+              snapshot was published yet.
+    """
+    path = os.path.join(snapshot_dir, "LATEST")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as pointer_file:
+            pointer = json.load(pointer_file)
+    except (OSError, ValueError):
+        return None
+    return pointer if os.path.exists(pointer["path"]) else None
+
+def get_latest_portfolio_file(default_file):
+    """
+    Return the portfolio file the dashboards should read.
+
+    Args:
+        default_file (str): Output to fall back on before the first snapshot.
+
+    Returns:
+        str: Path of the latest snapshot's portfolio, or `default_file`.
+    """
+    pointer = get_latest_snapshot()
+    return pointer["path"] if pointer else default_file
@@ -0,0 +1,193 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from metrics import registry
+from price_client import AlphaVantageClient, DailyLimitError, PremiumEndpointError, PriceFetchError, TokenBucket
+from price_providers import AlphaVantageProvider
+from quote_cache import QuoteCache
+
+# Payloads as Alpha Vantage sends them. Both throttle messages link to the
+# premium plans, which is what makes them easy to mistake for a tier error.
+MINUTE_LIMIT = {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute "
+                        "and 500 calls per day. Please visit https://www.alphavantage.co/premium/ if you would like "
+                        "to target a higher API call frequency."}
+DAILY_LIMIT = {"Information": "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day. "
+                              "Please subscribe to any of the premium plans at https://www.alphavantage.co/premium/ "
+                              "to instantly remove all daily rate limits."}
+PREMIUM_ENDPOINT = {"Information": "Thank you for using Alpha Vantage! This is a premium endpoint. You may subscribe "
+                                   "to any of the premium plans at https://www.alphavantage.co/premium/ to instantly "
+                                   "unlock all premium endpoints"}
+QUOTE = {"Global Quote": {"01. symbol": "AAPL", "05. price": "187.5000"}}
+BULK = {"data": [{"symbol": "AAPL", "close": "187.50"}, {"symbol": "MSFT", "close": "410.25"}]}
+PRICES = {"AAPL": 187.5, "MSFT": 410.25, "BTC": 67250.0}
+
+def route(bulk_reply):
+    """
+    Build a reply function that answers by API function, like the real service.
+
+    Args:
+        bulk_reply (tuple): (status, payload) for REALTIME_BULK_QUOTES calls.
+
+    Returns:
+        function: Maps a request's query parameters to (status, payload).
+    """
+    def reply(params):
+        function = params["function"][0]
+        if function == "REALTIME_BULK_QUOTES":
+            return bulk_reply
+        if function == "GLOBAL_QUOTE":
+            symbol = params["symbol"][0]
+            return 200, {"Global Quote": {"01. symbol": symbol, "05. price": str(PRICES[symbol])}}
+        if function == "CURRENCY_EXCHANGE_RATE":
+            return 200, {"Realtime Currency Exchange Rate": {"5. Exchange Rate": str(PRICES[params["from_currency"][0]])}}
+        return 400, {"Error Message": f"Unknown function {function}"}
+    return reply
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer every request with the next scripted reply of the server."""
+
+    def do_GET(self):
+        server = self.server
+        params = parse_qs(urlparse(self.path).query)
+        with server.lock:
+            server.requests.append(params)
+            if callable(server.replies):
+                status, payload = server.replies(params)
+            else:
+                status, payload = server.replies[min(len(server.requests), len(server.replies)) - 1]
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    """
+    A local stand-in for the Alpha Vantage API.
+
+    Replies are served in order; once they run out, the last one repeats.
+    A function instead of a list is called with each request's query
+    parameters. Every request's query parameters are kept in `requests`.
+    """
+
+    def __init__(self, replies):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.replies = replies
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        """str: Base URL to point a client at."""
+        return f"http://127.0.0.1:{self.server_address[1]}/query"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+def make_client(server, max_retries=2):
+    """Return a client for the stub that neither waits on the rate limiter nor on throttles."""
+    return AlphaVantageClient(api_key="stub", base_url=server.url, rate_limiter=TokenBucket(60_000),
+                              max_retries=max_retries, throttle_wait=0)
+
+def make_provider(client, directory):
+    """Return a live provider on the stub client, with its quote cache in `directory`."""
+    provider = AlphaVantageProvider(client)
+    provider._quote_cache = QuoteCache(os.path.join(directory, "quote_cache.db"))
+    return provider
+
+def check(name, replies, call, expected, expected_requests, max_retries=2):
+    """
+    Run one client call against a scripted stub and compare the outcome.
+
+    Args:
+        name (str): Description of the case.
+        replies (list): (status, payload) pairs the stub answers with, or a
+                        function of the query parameters returning one.
+        call (function): Called with the client; its return value is the outcome.
+        expected: The expected return value, or the exception class it should raise.
+        expected_requests (int): How many requests the call should make.
+        max_retries (int): Retries the client is allowed.
+
+    Returns:
+        bool: Whether the case passed.
+    """
+    with StubServer(replies) as server:
+        client = make_client(server, max_retries)
+        try:
+            outcome = call(client)
+        except PriceFetchError as error:
+            outcome = type(error)
+        passed = outcome == expected and len(server.requests) == expected_requests
+        print(f"{'ok  ' if passed else 'FAIL'} {name}: {outcome!r} after {len(server.requests)} request(s)"
+              + ("" if passed else f", expected {expected!r} after {expected_requests}"))
+        return passed
+
+def run_stub_checks():
+    """
+    Exercise the client's throttle, retry and tier handling and the
+    provider's bulk fallback and crypto path against the stub.
+
+    Metrics recorded along the way go to a temporary file, so the stub's
+    latencies and throttles never reach METRICS_FILE.
+
+    Returns:
+        bool: True if every case passed.
+    """
+    quote = lambda client: client.quote("AAPL", "stock")
+    bulk = lambda client: client.bulk_quotes(["AAPL", "MSFT"])
+    stocks = [("AAPL", "stock"), ("MSFT", "stock")]
+
+    metrics_path = registry.path
+    with tempfile.TemporaryDirectory() as directory:
+        registry.path = os.path.join(directory, "metrics.json")
+
+        def fetch(requests):
+            # A fresh cache per case so every quote goes to the stub
+            def call(client):
+                cache_directory = tempfile.mkdtemp(dir=directory)
+                prices = make_provider(client, cache_directory).fetch(requests, lambda key: None)
+                return prices, client.bulk_supported
+            return call
+
+        cases = [
+            ("quote", [(200, QUOTE)], quote, (187.5, "GLOBAL_QUOTE"), 1),
+            ("per-minute limit is retried", [(200, MINUTE_LIMIT), (200, QUOTE)], quote, (187.5, "GLOBAL_QUOTE"), 2),
+            ("daily limit fails at once", [(200, DAILY_LIMIT), (200, QUOTE)], quote, DailyLimitError, 1),
+            ("throttled bulk probe is retried", [(200, MINUTE_LIMIT), (200, BULK)], bulk, {"AAPL": 187.5, "MSFT": 410.25}, 2),
+            ("premium endpoint is not retried", [(200, PREMIUM_ENDPOINT)], bulk, PremiumEndpointError, 1),
+            ("server error is retried", [(503, {}), (200, QUOTE)], quote, (187.5, "GLOBAL_QUOTE"), 2),
+            ("client error is not retried", [(400, {"Error Message": "Invalid API call."})], quote, PriceFetchError, 1),
+            ("persistent limit gives up", [(200, MINUTE_LIMIT)], quote, PriceFetchError, 3),
+            ("provider prices stocks in one bulk call", route((200, BULK)), fetch(stocks),
+             ({("AAPL", "stock"): 187.5, ("MSFT", "stock"): 410.25}, True), 1),
+            ("provider falls back per symbol without bulk access", route((200, PREMIUM_ENDPOINT)), fetch(stocks),
+             ({("AAPL", "stock"): 187.5, ("MSFT", "stock"): 410.25}, False), 3),
+            ("provider requests symbols missing from the bulk reply",
+             route((200, {"data": [{"symbol": "AAPL", "close": "187.50"}]})), fetch(stocks),
+             ({("AAPL", "stock"): 187.5, ("MSFT", "stock"): 410.25}, True), 2),
+            ("provider prices crypto through exchange rates", route((200, BULK)), fetch([("AAPL", "stock"), ("BTC", "crypto")]),
+             ({("AAPL", "stock"): 187.5, ("BTC", "crypto"): 67250.0}, True), 2),
+        ]
+        try:
+            results = [check(*case) for case in cases]
+        finally:
+            registry.flush()
+            registry.path = metrics_path
+    print(f"{sum(results)}/{len(results)} stub checks passed")
+    return all(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if run_stub_checks() else 1)
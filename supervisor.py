@@ -0,0 +1,219 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import psutil
+from portfolio_io import atomic_path
+from config import READY_TIMEOUT_SECONDS, RUN_DIR, STOP_TIMEOUT_SECONDS
+
+def is_port_ready(port, host="127.0.0.1"):
+    """
+    Check whether something accepts connections on a local port.
+
+    Args:
+        port (int): Port to probe.
+        host (str): Interface to connect to.
+
+    Returns:
+        bool: True if a connection could be opened.
+    """
+    try:
+        with socket.create_connection((host, port), timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+def is_listening(process, port):
+    """
+    Check whether a process itself holds a listening socket on a port.
+
+    Args:
+        process (psutil.Process): The process to inspect.
+        port (int): Port it should serve.
+
+    Returns:
+        bool: True if the process listens on the port.
+    """
+    try:
+        # Named `connections` before psutil 6
+        connections = getattr(process, "net_connections", process.connections)(kind="inet")
+    except psutil.Error:
+        return False
+    return any(connection.status == psutil.CONN_LISTEN and connection.laddr.port == port for connection in connections)
+
+class Supervisor:
+    """
+    Launch, track and stop the processes the menu depends on.
+
+    Every child is recorded in a PID file under `run_dir` together with its
+    start time, so a later supervisor (after the menu restarts) can stop
+    exactly the processes an earlier one started, and never an unrelated
+    process that happens to reuse the PID or hold the port. Each lookup
+    touches one PID; nothing scans the process table.
+    """
+
+    def __init__(self, run_dir=RUN_DIR):
+        self.run_dir = run_dir
+        self.children = {}
+        os.makedirs(run_dir, exist_ok=True)
+
+    def get_pid_file(self, name):
+        """Return the PID file of a named child."""
+        return os.path.join(self.run_dir, f"{name}.pid")
+
+    def write_pid_file(self, name, process):
+        """
+        Record a process under a name.
+
+        Args:
+            name (str): Name of the child.
+            process (psutil.Process): The process to record.
+        """
+        record = {"pid": process.pid, "create_time": process.create_time(), "command": process.cmdline()}
+        with atomic_path(self.get_pid_file(name)) as temp_path:
+            with open(temp_path, "w") as pid_file:
+                json.dump(record, pid_file)
+
+    def get_process(self, name):
+        """
+        Return the recorded process for a name if it is still running.
+
+        Args:
+            name (str): Name of the child.
+
+        Returns:
+            psutil.Process: The live process, or None if it exited, the PID
+                            file is missing, or the PID now belongs to
+                            another process.
+        """
+        child = self.children.get(name)
+        if child is not None and child.poll() is not None:
+            # Reap the finished child so it does not linger as a zombie
+            del self.children[name]
+
+        path = self.get_pid_file(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as pid_file:
+                record = json.load(pid_file)
+            process = psutil.Process(record["pid"])
+            if process.create_time() == record["create_time"] and process.status() != psutil.STATUS_ZOMBIE:
+                return process
+        except (OSError, ValueError, KeyError, psutil.Error):
+            pass
+        os.remove(path)
+        return None
+
+    def is_running(self, name):
+        """Return whether the named child is running."""
+        return self.get_process(name) is not None
+
+    def start(self, name, script, args=(), port=None, restart=True):
+        """
+        Start a Python script as a tracked child.
+
+        Args:
+            name (str): Name to track the child under.
+            script (str): Script to run with the current interpreter.
+            args (list): Command-line arguments for the script.
+            port (int, optional): Port the child serves; `start` waits until
+                                  it accepts connections.
+            restart (bool): Stop a running child of the same name first.
+                            Otherwise a running child is left alone.
+
+        Returns:
+            int: PID of the running child.
+        """
+        process = self.get_process(name)
+        if process is not None:
+            if not restart:
+                print(f"{name} is already running (pid {process.pid})")
+                return process.pid
+            self.stop(name)
+
+        if port is not None and is_port_ready(port):
+            print(f"Port {port} is already in use; {name} may not be able to serve it")
+        child = subprocess.Popen([sys.executable, script, *args])
+        self.children[name] = child
+        self.write_pid_file(name, psutil.Process(child.pid))
+        if port is not None and not self.wait_ready(name, port):
+            if self.is_running(name):
+                print(f"{name} did not start listening on port {port} within {READY_TIMEOUT_SECONDS}s")
+            else:
+                print(f"{name} exited before listening on port {port}")
+        return child.pid
+
+    def wait_ready(self, name, port, timeout=READY_TIMEOUT_SECONDS):
+        """
+        Wait until a child accepts connections on its port.
+
+        Args:
+            name (str): Name of the child.
+            port (int): Port the child serves.
+            timeout (float): Seconds to wait.
+
+        Another process already holding the port does not count: the child
+        must be alive and listening on it itself.
+
+        Returns:
+            bool: True once the child serves the port; False if it exited or
+                  the timeout passed.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            child = self.children.get(name)
+            if child is not None and child.poll() is not None:
+                return False
+            process = self.get_process(name)
+            if process is None:
+                return False
+            if is_port_ready(port) and is_listening(process, port):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def stop(self, name, timeout=STOP_TIMEOUT_SECONDS):
+        """
+        Stop a tracked child, killing it if it ignores the request to exit.
+
+        Args:
+            name (str): Name of the child.
+            timeout (float): Seconds to wait after terminating before killing.
+        """
+        process = self.get_process(name)
+        if process is not None:
+            try:
+                process.terminate()
+                process.wait(timeout)
+            except psutil.TimeoutExpired:
+                process.kill()
+                process.wait(timeout)
+            except psutil.NoSuchProcess:
+                pass
+        child = self.children.pop(name, None)
+        if child is not None:
+            child.poll()
+        if os.path.exists(self.get_pid_file(name)):
+            os.remove(self.get_pid_file(name))
+
+    def claim(self, name):
+        """
+        Record the current process under a name, stopping its previous holder.
+
+        Used by the menu itself so starting it again replaces the old menu.
+
+        Args:
+            name (str): Name to record the current process under.
+        """
+        process = self.get_process(name)
+        if process is not None and process.pid != os.getpid():
+            self.stop(name)
+        self.write_pid_file(name, psutil.Process())
+
+    def stop_all(self):
+        """Stop every child this supervisor started."""
+        for name in list(self.children):
+            self.stop(name)
@@ -1,6 +1,5 @@
 import argparse
-import os
-from dotenv import dotenv_values
+import webbrowser
 from dash import html, dcc
 
 # Function Definitions
@@ -38,6 +37,16 @@ def parse_args():
     parser.add_argument("--theme", type=str, default="blue", help="Theme to use")
     return parser.parse_args()
 
+def open_browser(port, path="/"):
+    """
+    Open a local Dash app in a new browser window.
+
+    Args:
+        port (int): Port the app listens on.
+        path (str): Page to open.
+    """
+    webbrowser.open_new(f"http://127.0.0.1:{port}{path}")
+
 def get_colors(theme_name):
     """
     Returns the selected theme's color palette.
@@ -185,30 +194,15 @@ def generate_main_content(theme):
             ),
             # Output Section
             html.Div(id="output", style={"textAlign": "center", "marginTop": "20px", "fontSize": "16px"}),
+            # Run Report Section (progress while a calculation runs, then its report)
+            html.Div(id="run_report", style={"textAlign": "center", "marginTop": "10px", "fontSize": "14px"}),
+            dcc.Interval(id="report_interval", interval=1000, disabled=True),
         ],
     )
 
-# Load API keys from environment file
-API_KEYS = dotenv_values("input/api_key.md")
-ALPHA_VANTAGE_API_KEY = API_KEYS.get("ALPHA_VANTAGE_API_KEY")
-
-# Constants
-LONG_TERM_HOLD_YEARS = 2
-
 # Feature Flags
 SHOW_DOLLAR = True
 
-# File Paths
-INPUT_FILE = "input/portfolio.csv"
-TEMP_FILE = "input/temp_portfolio.csv"
-DATA_FILE = "input/income_expenses.csv"
-
-# Ports
-PORT_MAIN = 8050
-PORT_PORTFOLIO = 8051
-PORT_BUDGET = 8052
-PORT_API = 8053
-
 # Colors
 GAIN_COLOR_SCHEME = {
     "positive_long": "#a7c957",
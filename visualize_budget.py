@@ -3,18 +3,22 @@ from dash import Dash, dcc, html
 import plotly.graph_objects as go
 import plotly.express as px
 from threading import Timer
-from main import kill_port, open_browser
+import utils
+from data_cache import data_cache
+from config import (
+    DATA_FILE,
+    PORT_BUDGET
+)
 from utils import (
     configure_pie_traces,
+    open_browser,
     parse_args,
     set_current_theme,
-    DATA_FILE,
     DEFAULT_STYLE,
     DIVIDER_STYLE,
     H1_STYLE,
     H2_STYLE,
     PIE_SCHEME,
-    PORT_BUDGET,
     SHOW_DOLLAR,
     TABLE_HEADER_STYLE,
     TABLE_ROW_STYLE,
@@ -22,16 +26,19 @@ from utils import (
     TABLE_STYLE
 )
 
-def visualize_budget(data_file):
+def load_budget_data(data_file):
     """
-    Generate and display budget visualizations using Dash.
+    Load budget data and prepare the cash flow diagram.
 
     Args:
         data_file (str): Path to the CSV file containing budget data.
-    """
-    # Free the port for the budget visualization
-    kill_port(PORT_BUDGET)
 
+    Returns:
+        dict: Income and expense rows, their totals, and the Sankey nodes and links.
+
+    Raises:
+        ValueError: If the file lacks either income or expense rows.
+    """
     # Load budget data
     data = pd.read_csv(data_file)
 
@@ -85,11 +92,49 @@ def visualize_budget(data_file):
         links["value"].append(savings)
         links["color"].append("#197")  # Custom savings color
 
-    # Create Dash app
-    app = Dash(__name__)
+    return {
+        "income_data": income_data,
+        "expenses_data": expenses_data,
+        "total_income": total_income,
+        "total_expenses": total_expenses,
+        "nodes": nodes,
+        "links": links,
+    }
 
-    # Layout for the Dash app
-    app.layout = html.Div(style=DEFAULT_STYLE, children=[
+def build_budget_layout(data_file, show_dollar=True):
+    """
+    Return the budget dashboard page, built once per file, flag and theme.
+
+    Args:
+        data_file (str): Path to the CSV file containing budget data.
+        show_dollar (bool): Whether to show dollar amounts or only percentages.
+
+    Returns:
+        dash.html.Div: The page layout.
+    """
+    return data_cache.get(data_file, render_budget_layout, show_dollar, utils.current_theme)
+
+def render_budget_layout(data_file, show_dollar, theme):
+    """
+    Build the budget dashboard page.
+
+    Args:
+        data_file (str): Path to the CSV file containing budget data.
+        show_dollar (bool): Whether to show dollar amounts or only percentages.
+        theme (str): Current theme; the styles already reflect it.
+
+    Returns:
+        dash.html.Div: The page layout.
+    """
+    data = data_cache.get(data_file, load_budget_data)
+    income_data = data["income_data"]
+    expenses_data = data["expenses_data"]
+    total_income = data["total_income"]
+    total_expenses = data["total_expenses"]
+    nodes = data["nodes"]
+    links = data["links"]
+
+    return html.Div(style=DEFAULT_STYLE, children=[
         # Title Section
         html.H1("Budget Visualization", style=H1_STYLE),
         html.Hr(style=DIVIDER_STYLE),
@@ -118,7 +163,7 @@ def visualize_budget(data_file):
                         value=links["value"],
                         color=links["color"],
                         hovertemplate="<b>%{source.label} → %{target.label}</b><br>"
-                                      f"{'Amount: $%{value:,.2f}' if SHOW_DOLLAR else 'Percentage: %{value:.1f}%'}<extra></extra>"
+                                      f"{'Amount: $%{value:,.2f}' if show_dollar else 'Percentage: %{value:.1f}%'}<extra></extra>"
                     )
                 )).update_layout(
                     margin=dict(l=50, r=50, t=50, b=50),
@@ -151,7 +196,7 @@ def visualize_budget(data_file):
                         )
                     ),
                     expenses_data["Amount"],
-                    show_dollar=SHOW_DOLLAR
+                    show_dollar=show_dollar
                 )
             )
         ]),
@@ -182,7 +227,7 @@ def visualize_budget(data_file):
                     html.Tr([
                         html.Td(row["Source"], style={**TABLE_ROW_STYLE, "width": "50%"}),
                         html.Td(
-                            f"${row['Amount']:,.2f}" if SHOW_DOLLAR else f"{(row['Amount'] / total_income) * 100:.1f}%",
+                            f"${row['Amount']:,.2f}" if show_dollar else f"{(row['Amount'] / total_income) * 100:.1f}%",
                             style={**TABLE_ROW_STYLE, "width": "50%"}
                         )
                     ])
@@ -208,7 +253,7 @@ def visualize_budget(data_file):
                     html.Tr([
                         html.Td(row["Source"], style={**TABLE_ROW_STYLE, "width": "50%"}),
                         html.Td(
-                            f"${row['Amount']:,.2f}" if SHOW_DOLLAR else f"{(row['Amount'] / total_expenses) * 100:.1f}%",
+                            f"${row['Amount']:,.2f}" if show_dollar else f"{(row['Amount'] / total_expenses) * 100:.1f}%",
                             style={**TABLE_ROW_STYLE, "width": "50%"}
                         )
                     ])
@@ -218,6 +263,19 @@ def visualize_budget(data_file):
         ])
     ])
 
+def visualize_budget(data_file):
+    """
+    Generate and display budget visualizations in a standalone Dash app.
+
+    The main menu serves the same page at /budget; this entry point is for
+    running the dashboard on its own.
+
+    Args:
+        data_file (str): Path to the CSV file containing budget data.
+    """
+    app = Dash(__name__)
+    app.layout = build_budget_layout(data_file, SHOW_DOLLAR)
+
     # Automatically open the app in the browser
     Timer(1, open_browser, args=[PORT_BUDGET]).start()
 
@@ -1,11 +1,22 @@
+import os
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from dash import Dash, dcc, html, Input, Output
+from dash import Dash, dcc, html, Input, Output, State
 from threading import Timer
-from main import kill_port, open_browser
+import utils
+from data_cache import data_cache
+from metrics import timed_callback
+from portfolio_io import get_returns_file, read_portfolio
+from price_history import PriceHistoryStore, portfolio_value_history
+from snapshots import get_latest_portfolio_file
+from config import (
+    PORT_PORTFOLIO,
+    TEMP_FILE
+)
 from utils import (
     configure_pie_traces,
+    open_browser,
     parse_args,
     set_current_theme,
     CONTRIBUTION_COLORS,
@@ -15,27 +26,40 @@ from utils import (
     H1_STYLE,
     H2_STYLE,
     PIE_SCHEME,
-    PORT_PORTFOLIO,
     SHOW_DOLLAR,
     TABLE_HEADER_STYLE,
     TABLE_ROW_STYLE,
     TABLE_SECTION_TITLE_STYLE,
-    TABLE_STYLE,
-    TEMP_FILE
+    TABLE_STYLE
 )
 
-def visualize_portfolio(portfolio_file):
+def format_percent(value):
     """
-    Generate and display portfolio visualizations using Dash.
+    Format a return for the tables.
 
     Args:
-        portfolio_file (str): Path to the portfolio CSV file.
+        value (float): A percentage, NaN when it could not be computed.
+
+    Returns:
+        str: The value with two decimals and a percent sign, or "n/a".
     """
-    # Free up the specified port before running the app
-    kill_port(PORT_PORTFOLIO)
+    return "n/a" if pd.isna(value) else f"{value:.2f}%"
 
+def load_portfolio_data(portfolio_file):
+    """
+    Load a computed portfolio and summarize it for the portfolio page.
+
+    Args:
+        portfolio_file (str): Path to the computed portfolio (Parquet, Feather or CSV).
+
+    Returns:
+        dict: The frames the page is built from, and the price history store.
+
+    Raises:
+        ValueError: If no position has a positive value.
+    """
     # Load and validate the portfolio data
-    portfolio = pd.read_csv(portfolio_file)
+    portfolio = read_portfolio(portfolio_file)
     valid_portfolio = portfolio[portfolio["Value"] > 0].copy()
 
     if valid_portfolio.empty:
@@ -49,6 +73,15 @@ def visualize_portfolio(portfolio_file):
         axis=1
     )
 
+    # 4. Annualized returns per ticker, type and for the whole portfolio
+    returns_file = get_returns_file(portfolio_file)
+    if os.path.exists(returns_file):
+        returns_summary = read_portfolio(returns_file)
+    else:
+        returns_summary = pd.DataFrame(columns=["Level", "Name", "Since", "% XIRR", "% TWR"])
+    ticker_returns = returns_summary[returns_summary["Level"] == "Ticker"].sort_values(by="% XIRR", ascending=False)
+    group_returns = returns_summary[returns_summary["Level"] != "Ticker"]
+
     # Summarize data for visualizations
     # 1. Distribution by Type for the pie chart
     type_summary = valid_portfolio.groupby("Type").agg({"Value": "sum"}).reset_index()
@@ -65,12 +98,57 @@ def visualize_portfolio(portfolio_file):
     )
     contribution_summary = contribution_summary[["Label", "Investment", "Value"]]
 
-    # Set up Dash app
-    app = Dash(__name__)
+    return {
+        "valid_portfolio": valid_portfolio,
+        "type_summary": type_summary,
+        "gain_loss_summary": gain_loss_summary,
+        "contribution_summary": contribution_summary,
+        "ticker_returns": ticker_returns,
+        "group_returns": group_returns,
+        # Lots and stored closes for the history chart
+        "valued_lots": portfolio[portfolio["Value"] > 0],
+        "history_store": PriceHistoryStore(),
+    }
 
-    app.layout = html.Div(
+def build_portfolio_layout(portfolio_file, show_dollar=True):
+    """
+    Return the portfolio dashboard page, built once per file, flag and theme.
+
+    Args:
+        portfolio_file (str): Path to the computed portfolio (Parquet, Feather or CSV).
+        show_dollar (bool): Whether to show dollar amounts or only percentages.
+
+    Returns:
+        dash.html.Div: The page layout.
+    """
+    return data_cache.get(portfolio_file, render_portfolio_layout, show_dollar, utils.current_theme)
+
+def render_portfolio_layout(portfolio_file, show_dollar, theme):
+    """
+    Build the portfolio dashboard page.
+
+    Args:
+        portfolio_file (str): Path to the computed portfolio (Parquet, Feather or CSV).
+        show_dollar (bool): Whether to show dollar amounts or only percentages.
+        theme (str): Current theme; the styles already reflect it.
+
+    Returns:
+        dash.html.Div: The page layout.
+    """
+    data = data_cache.get(portfolio_file, load_portfolio_data)
+    valid_portfolio = data["valid_portfolio"]
+    type_summary = data["type_summary"]
+    gain_loss_summary = data["gain_loss_summary"]
+    contribution_summary = data["contribution_summary"]
+    ticker_returns = data["ticker_returns"]
+    group_returns = data["group_returns"]
+
+    return html.Div(
         style=DEFAULT_STYLE,
         children=[
+            # Page state read by the history callback
+            dcc.Store(id="portfolio_view", data={"file": portfolio_file, "show_dollar": show_dollar}),
+
             # Title
             html.H1("Portfolio Visualization", style=H1_STYLE),
             html.Hr(style=DIVIDER_STYLE),
@@ -100,7 +178,7 @@ def visualize_portfolio(portfolio_file):
                                 )
                             ),
                             type_summary["Value"],
-                            show_dollar=SHOW_DOLLAR
+                            show_dollar=show_dollar
                         )
                     )
                 ]
@@ -134,7 +212,7 @@ def visualize_portfolio(portfolio_file):
                                         axis=1
                                     ),
                                     text=gain_loss_summary.apply(
-                                        lambda row: f"${row['Gain/Loss']:,.2f} ({row['% Gain/Loss']:.1f}%)" if SHOW_DOLLAR else f"{row['% Gain/Loss']:.1f}%",
+                                        lambda row: f"${row['Gain/Loss']:,.2f} ({row['% Gain/Loss']:.1f}%)" if show_dollar else f"{row['% Gain/Loss']:.1f}%",
                                         axis=1
                                     ),
                                     textposition="outside",
@@ -156,7 +234,7 @@ def visualize_portfolio(portfolio_file):
                             ),
                             yaxis=dict(
                                 title=dict(
-                                    text="Gain/Loss (%)" if not SHOW_DOLLAR else "Gain/Loss ($)",
+                                    text="Gain/Loss (%)" if not show_dollar else "Gain/Loss ($)",
                                     font=dict(
                                         size=int(DEFAULT_STYLE["fontSize"].replace("px", "")),
                                         family=DEFAULT_STYLE["fontFamily"],
@@ -203,7 +281,7 @@ def visualize_portfolio(portfolio_file):
                                 y=contribution_summary["Investment"],
                                 marker_color=CONTRIBUTION_COLORS["investment"],
                                 text=contribution_summary["Investment"].apply(
-                                    lambda x: f"${x:,.2f}" if SHOW_DOLLAR else ""),
+                                    lambda x: f"${x:,.2f}" if show_dollar else ""),
                                 textposition="outside"
                             ),
                             go.Bar(
@@ -212,7 +290,7 @@ def visualize_portfolio(portfolio_file):
                                 y=contribution_summary["Value"],
                                 marker_color=CONTRIBUTION_COLORS["current_value"],
                                 text=contribution_summary["Value"].apply(
-                                    lambda x: f"${x:,.2f}" if SHOW_DOLLAR else ""),
+                                    lambda x: f"${x:,.2f}" if show_dollar else ""),
                                 textposition="outside"
                             )
                         ]).update_layout(
@@ -261,6 +339,124 @@ def visualize_portfolio(portfolio_file):
             ),
             html.Hr(style=DIVIDER_STYLE),
 
+            # Returns Section
+            html.Div(
+                style={
+                    "backgroundColor": TABLE_STYLE["backgroundColor"],
+                    "padding": "20px",
+                    "borderRadius": "10px",
+                    "marginBottom": "20px"
+                },
+                children=[
+                    html.H2("Returns", style=H2_STYLE),
+                    dcc.Graph(
+                        figure=go.Figure(data=[
+                            go.Bar(
+                                name="Money-Weighted (XIRR)",
+                                x=ticker_returns["Name"],
+                                y=ticker_returns["% XIRR"],
+                                marker_color=CONTRIBUTION_COLORS["investment"],
+                                hovertemplate="<b>%{x}</b><br>XIRR: %{y:.2f}%<extra></extra>"
+                            ),
+                            go.Bar(
+                                name="Time-Weighted (TWR)",
+                                x=ticker_returns["Name"],
+                                y=ticker_returns["% TWR"],
+                                marker_color=CONTRIBUTION_COLORS["current_value"],
+                                hovertemplate="<b>%{x}</b><br>TWR: %{y:.2f}%<extra></extra>"
+                            )
+                        ]).update_layout(
+                            xaxis=dict(
+                                title=dict(
+                                    text="Ticker",
+                                    font=dict(
+                                        size=int(DEFAULT_STYLE["fontSize"].replace("px", "")),
+                                        family=DEFAULT_STYLE["fontFamily"],
+                                        color=DEFAULT_STYLE["color"]
+                                    )
+                                ),
+                                tickfont=dict(color=DEFAULT_STYLE["color"]),
+                                tickangle=45
+                            ),
+                            yaxis=dict(
+                                title=dict(
+                                    text="Annualized Return (%)",
+                                    font=dict(
+                                        size=int(DEFAULT_STYLE["fontSize"].replace("px", "")),
+                                        family=DEFAULT_STYLE["fontFamily"],
+                                        color=DEFAULT_STYLE["color"]
+                                    )
+                                ),
+                                tickfont=dict(color=DEFAULT_STYLE["color"])
+                            ),
+                            barmode="group",
+                            paper_bgcolor=TABLE_STYLE["backgroundColor"],
+                            legend=dict(
+                                itemsizing="constant",
+                                traceorder="normal",
+                                orientation="h",
+                                yanchor="bottom",
+                                y=1.02,
+                                xanchor="right",
+                                x=1,
+                                font=dict(
+                                    family=H2_STYLE["fontFamily"],
+                                    color=H2_STYLE["color"]
+                                )
+                            ),
+                            showlegend=True
+                        )
+                    ),
+                    html.Table(
+                        children=[
+                            html.Tr([
+                                html.Th("Type", style={**TABLE_HEADER_STYLE, "width": "25%"}),
+                                html.Th("Since", style={**TABLE_HEADER_STYLE, "width": "25%"}),
+                                html.Th("Money-Weighted (XIRR)", style={**TABLE_HEADER_STYLE, "width": "25%"}),
+                                html.Th("Time-Weighted (TWR)", style={**TABLE_HEADER_STYLE, "width": "25%"})
+                            ]),
+                            *[
+                                html.Tr([
+                                    html.Td(
+                                        str(row["Name"]).upper(),
+                                        style={**TABLE_ROW_STYLE, "width": "25%", "fontWeight": "bold" if row["Level"] == "Portfolio" else "normal"}
+                                    ),
+                                    html.Td(row["Since"], style={**TABLE_ROW_STYLE, "width": "25%"}),
+                                    html.Td(format_percent(row['% XIRR']), style={**TABLE_ROW_STYLE, "width": "25%"}),
+                                    html.Td(format_percent(row['% TWR']), style={**TABLE_ROW_STYLE, "width": "25%"})
+                                ])
+                                for _, row in group_returns.iterrows()
+                            ]
+                        ],
+                        style=TABLE_STYLE
+                    )
+                ]
+            ),
+            html.Hr(style=DIVIDER_STYLE),
+
+            # History Section
+            html.Div(
+                style={
+                    "backgroundColor": TABLE_STYLE["backgroundColor"],
+                    "padding": "20px",
+                    "borderRadius": "10px",
+                    "marginBottom": "20px"
+                },
+                children=[
+                    html.H2("History", style=H2_STYLE),
+                    html.Div(
+                        dcc.DatePickerRange(
+                            id="history_range",
+                            start_date=(pd.Timestamp.now() - pd.DateOffset(years=1)).date(),
+                            end_date=pd.Timestamp.now().date(),
+                        ),
+                        style={"textAlign": "center"}
+                    ),
+                    dcc.Graph(id="history_graph")
+                ]
+            ),
+            html.Hr(style=DIVIDER_STYLE),
+
             # Overview Section
             html.Div(
                 style={
@@ -345,11 +541,80 @@ def visualize_portfolio(portfolio_file):
                             ]
                         )
                     ]
-                ) if SHOW_DOLLAR else []
+                ) if show_dollar else []
             )
         ]
     )
 
+def register_portfolio_callbacks(app):
+    """
+    Register the portfolio page's callbacks on a Dash app.
+
+    Args:
+        app (dash.Dash): The app serving the page.
+    """
+    @app.callback(
+        Output("history_graph", "figure"),
+        [Input("history_range", "start_date"), Input("history_range", "end_date")],
+        State("portfolio_view", "data"),
+    )
+    @timed_callback("portfolio")
+    def update_history(start_date, end_date, view):
+        data = data_cache.get(view["file"], load_portfolio_data)
+        history = portfolio_value_history(data["valued_lots"], start_date, end_date, data["history_store"])
+        if not view["show_dollar"]:
+            # Show growth relative to the first day with a value instead of dollar amounts
+            held = history[history > 0]
+            history = history.loc[held.index[0]:] / held.iloc[0] * 100 if not held.empty else history.iloc[:0]
+        if history.empty or not history.any():
+            # New tickers, or a range before the first backfill, have no stored closes
+            return go.Figure().update_layout(
+                annotations=[dict(text="No price history for this range", showarrow=False,
+                                  font=dict(color=DEFAULT_STYLE["color"]))],
+                xaxis=dict(visible=False),
+                yaxis=dict(visible=False),
+                paper_bgcolor=TABLE_STYLE["backgroundColor"],
+            )
+        return go.Figure(
+            data=[
+                go.Scatter(
+                    x=history.index,
+                    y=history,
+                    mode="lines",
+                    line=dict(color=CONTRIBUTION_COLORS["current_value"]),
+                    hovertemplate="%{x|%Y-%m-%d}<br>%{y:,.2f}<extra></extra>",
+                )
+            ]
+        ).update_layout(
+            xaxis=dict(tickfont=dict(color=DEFAULT_STYLE["color"])),
+            yaxis=dict(
+                title=dict(
+                    text="Value ($)" if view["show_dollar"] else "Value (start = 100)",
+                    font=dict(
+                        size=int(DEFAULT_STYLE["fontSize"].replace("px", "")),
+                        family=DEFAULT_STYLE["fontFamily"],
+                        color=DEFAULT_STYLE["color"]
+                    )
+                ),
+                tickfont=dict(color=DEFAULT_STYLE["color"])
+            ),
+            paper_bgcolor=TABLE_STYLE["backgroundColor"],
+        )
+
+def visualize_portfolio(portfolio_file):
+    """
+    Generate and display portfolio visualizations in a standalone Dash app.
+
+    The main menu serves the same page at /portfolio; this entry point is
+    for running the dashboard on its own.
+
+    Args:
+        portfolio_file (str): Path to the computed portfolio (Parquet, Feather or CSV).
+    """
+    app = Dash(__name__)
+    app.layout = build_portfolio_layout(portfolio_file, SHOW_DOLLAR)
+    register_portfolio_callbacks(app)
+
     # Open the app in the browser
     Timer(1, open_browser, args=[PORT_PORTFOLIO]).start()
 
@@ -360,4 +625,4 @@ if __name__ == "__main__":
     args = parse_args()
     SHOW_DOLLAR = args.show_dollar
     set_current_theme(args.theme)
-    visualize_portfolio(TEMP_FILE)
\ No newline at end of file
+    visualize_portfolio(get_latest_portfolio_file(TEMP_FILE))
\ No newline at end of file
@@ -0,0 +1,176 @@
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import WORKER_POOL_SIZE, WORKER_PRELOAD
+
+# Jobs the pool can run: name -> (module, function)
+JOBS = {
+    "calculate": ("calculate_portfolio", "run_calculation"),
+}
+
+def warm_up():
+    """Return the worker's PID; used to start workers ahead of the first job."""
+    return os.getpid()
+
+def run_job(name, *args, **kwargs):
+    """
+    Run a named job inside a worker.
+
+    The job's module was imported by the fork server before the worker was
+    forked, so resolving it here costs a dictionary lookup.
+
+    Args:
+        name (str): A key of JOBS.
+        *args: Positional arguments for the job.
+        **kwargs: Keyword arguments for the job.
+
+    Returns:
+        The job's return value.
+    """
+    module_name, function_name = JOBS[name]
+    return getattr(importlib.import_module(module_name), function_name)(*args, **kwargs)
+
+class Job:
+    """
+    One submitted job, shared by every request that arrived while it ran.
+
+    Attributes:
+        name (str): A key of JOBS.
+        future (Future): The job's result.
+        started_at (float): Time the job was submitted.
+        finished_at (float): Time the job finished, None while it runs.
+        requests (int): How many requests this run is serving.
+    """
+
+    def __init__(self, name, future):
+        self.name = name
+        self.future = future
+        self.started_at = time.time()
+        self.finished_at = None
+        self.requests = 1
+        future.add_done_callback(self.finish)
+
+    def finish(self, future):
+        """Record when the job finished and print why it failed, if it did."""
+        self.finished_at = time.time()
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Job {self.name} failed: {future.exception()}")
+
+    def done(self):
+        """Return whether the job has finished."""
+        return self.future.done()
+
+    def elapsed(self):
+        """Return seconds since the job was submitted, up to when it finished."""
+        return (self.finished_at or time.time()) - self.started_at
+
+class WorkerPool:
+    """
+    Worker processes forked from a server that already imported the heavy modules.
+
+    The fork server loads pandas and the job modules once;
+    every worker is a fork of it, so a job starts without interpreter
+    startup or import cost. Workers stay alive between jobs, which also
+    keeps each worker's price provider, rate limiter and quote cache warm.
+    Only one job of each name runs at a time; asking for it again while it
+    runs joins the running job instead of queueing another. If a worker
+    dies, the next submit starts fresh workers.
+    """
+
+    def __init__(self, max_workers=WORKER_POOL_SIZE, preload=WORKER_PRELOAD):
+        self.context = multiprocessing.get_context("forkserver")
+        self.preload = preload
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.broken = False
+        self.executor = self.start_executor()
+
+    def start_executor(self):
+        """Return a new executor whose workers fork from a server with `preload` imported."""
+        self.context.set_forkserver_preload(self.preload)
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.context)
+
+    def restart(self):
+        """
+        Replace an executor left unusable by a worker that died.
+
+        A worker killed mid-job (out of memory, a crash) breaks the whole
+        executor, so every later submit would fail. Called with the lock held.
+        """
+        print("A worker process died; starting new workers.")
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self.start_executor()
+        self.broken = False
+        # Jobs of the old executor can only fail now; new requests must not join them
+        self.jobs = {name: job for name, job in self.jobs.items() if job.done()}
+
+    def check_broken(self, future):
+        """Note that the executor broke when a job failed because its worker died."""
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self.broken = True
+
+    def warm(self):
+        """
+        Start every worker now so the first job does not wait for one.
+
+        Returns:
+            list: PIDs of the workers.
+        """
+        futures = [self.executor.submit(warm_up) for _ in range(self.max_workers)]
+        return [future.result() for future in futures]
+
+    def warm_in_background(self):
+        """Start the workers without blocking the caller."""
+        threading.Thread(target=self.warm, daemon=True).start()
+
+    def submit(self, name, *args, **kwargs):
+        """
+        Run a job on a worker unless one of the same name is still running.
+
+        Args:
+            name (str): A key of JOBS.
+            *args: Positional arguments for the job.
+            **kwargs: Keyword arguments for the job.
+
+        Returns:
+            tuple: (The running Job, whether a new job was started)
+        """
+        with self.lock:
+            if self.broken:
+                self.restart()
+            job = self.jobs.get(name)
+            if job is not None and not job.done():
+                job.requests += 1
+                return job, False
+            try:
+                future = self.executor.submit(run_job, name, *args, **kwargs)
+            except BrokenProcessPool:
+                self.restart()
+                future = self.executor.submit(run_job, name, *args, **kwargs)
+            future.add_done_callback(self.check_broken)
+            job = Job(name, future)
+            self.jobs[name] = job
+            return job, True
+
+    def get_job(self, name):
+        """
+        Return the latest job of a name.
+
+        Args:
+            name (str): A key of JOBS.
+
+        Returns:
+            Job: The running or most recently finished job, or None if none
+                 was submitted yet.
+        """
+        with self.lock:
+            return self.jobs.get(name)
+
+    def shutdown(self):
+        """Stop the workers, dropping jobs that have not started."""
+        self.executor.shutdown(wait=False, cancel_futures=True)